@@ -1,23 +1,67 @@
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.middleware import SlowAPIMiddleware
 
 from app.app.composition.router import register_routers
+from app.app.registry.modules import REGISTERED_MODULES
+from app.shared.config.database import async_db, mongo
+from app.shared.config.indexes import ensure_indexes
 from app.shared.config.logging import configure_logging
-from app.shared.config.settings import APP_DESCRIPTION, APP_NAME, APP_VERSION, CORS_EFFECTIVE_ORIGINS
+from app.shared.config.settings import (
+    APP_DESCRIPTION,
+    APP_NAME,
+    APP_VERSION,
+    CORS_EFFECTIVE_ORIGINS,
+    MONGO_ENSURE_INDEXES,
+    OUTBOUND_DRAIN_SECONDS,
+    WEBHOOK_DRAIN_SECONDS,
+)
 from app.shared.middleware.rate_limit import limiter
+from app.shared.tools.conversation_workers import conversation_workers
 from app.shared.tools.embeddings import init_faiss
+from app.shared.tools.http_clients import close_http_clients
+from app.shared.tools.message_coalescer import message_coalescer
+from app.shared.tools.outbound_messages import outbound_queue
+from app.shared.tools.usage_tracker import usage_buffer
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    async with AsyncExitStack() as stack:
+        # Se cierra al final, despues de que la cola y los workers terminan de escribir.
+        mongo.open()
+        stack.callback(mongo.close)
+        # Los turnos que terminen durante el apagado siguen dejando uso; se vacia justo antes de cerrar Mongo.
+        stack.push_async_callback(usage_buffer.stop)
+        if MONGO_ENSURE_INDEXES:
+            await ensure_indexes(async_db)
+        # Si falta el shard del tenant por defecto se construye desde Mongo; va despues de abrir los clientes.
+        await asyncio.to_thread(init_faiss)
+        stack.push_async_callback(close_http_clients)
+        await outbound_queue.start()
+        stack.push_async_callback(outbound_queue.stop, OUTBOUND_DRAIN_SECONDS)
+        # Se detiene antes que la cola de salida para que las respuestas en curso alcancen a encolarse.
+        stack.push_async_callback(conversation_workers.stop, WEBHOOK_DRAIN_SECONDS)
+        stack.callback(message_coalescer.flush_all)
+        for module in REGISTERED_MODULES:
+            module_lifespan = module.load_lifespan()
+            if module_lifespan:
+                await stack.enter_async_context(module_lifespan(application))
+        yield
 
 
 def create_app():
     configure_logging()
-    init_faiss()
 
     application = FastAPI(
         title=APP_NAME,
         description=APP_DESCRIPTION,
         version=APP_VERSION,
+        lifespan=lifespan,
     )
     allow_all_origins = "*" in CORS_EFFECTIVE_ORIGINS
     application.add_middleware(
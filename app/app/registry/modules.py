@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from importlib import import_module
-from typing import Sequence
+from typing import Optional, Sequence
 
 from app.shared.config.settings import ENABLED_MODULES
 
@@ -11,11 +11,21 @@ class ModuleRegistration:
     description: str
     router_import: str
     env_vars: Sequence[str]
+    lifespan_import: Optional[str] = None
 
     def load_router(self):
-        module_name, attr_name = self.router_import.split(":")
-        module = import_module(module_name)
-        return getattr(module, attr_name)
+        return _import_attr(self.router_import)
+
+    def load_lifespan(self):
+        if not self.lifespan_import:
+            return None
+        return _import_attr(self.lifespan_import)
+
+
+def _import_attr(import_path: str):
+    module_name, attr_name = import_path.split(":")
+    module = import_module(module_name)
+    return getattr(module, attr_name)
 
 
 ALL_MODULES = (
@@ -48,6 +58,7 @@ ALL_MODULES = (
         description="Entrada de voz por Twilio Media Streams y OpenAI Realtime",
         router_import="app.modules.twilio_voice.routes.router:router",
         env_vars=("OPENAI_REALTIME_URL", "TWILIO_MEDIA_STREAM_URL"),
+        lifespan_import="app.modules.twilio_voice.tools.lifecycle:lifespan",
     ),
 )
 
@@ -65,6 +76,9 @@ COMMON_ENV_SECTIONS = (
         (
             ("OPENAI_API_KEY", "tu_openai_api_key_aqui"),
             ("OPENAI_MODEL", "gpt-4o-mini"),
+            ("CONTEXT_TOKEN_BUDGET", "3000"),
+            ("CONTEXT_TOKEN_BUDGET_BY_TENANT", ""),
+            ("CONTEXT_HISTORY_SHARE", "0.4"),
         ),
     ),
     (
@@ -75,6 +89,30 @@ COMMON_ENV_SECTIONS = (
             ("TIMEZONE", "America/Mexico_City"),
             ("API_BASE_URL", "http://localhost:3000"),
             ("FAISS_PATH", "faiss_index"),
+            ("FAISS_MAX_LOADED_SHARDS", "16"),
+            ("EMBEDDING_CACHE_MEMORY_SIZE", "4096"),
+            ("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3"),
+            ("WEBHOOK_WORKER_CONCURRENCY", "16"),
+            ("WEBHOOK_DRAIN_SECONDS", "20"),
+            ("MESSAGE_DEBOUNCE_SECONDS_BY_CHANNEL", ""),
+            ("MESSAGE_DEBOUNCE_MAX_WAIT_SECONDS", "8"),
+            ("WEBHOOK_DEDUP_STORE", "memory"),
+            ("WEBHOOK_DEDUP_TTL_SECONDS", "86400"),
+            ("WEBHOOK_DEDUP_MAX_ENTRIES", "50000"),
+            ("OUTBOUND_WORKERS", "8"),
+            ("OUTBOUND_MAX_ATTEMPTS", "6"),
+            ("OUTBOUND_RETRY_BASE_SECONDS", "1"),
+            ("OUTBOUND_RETRY_MAX_SECONDS", "60"),
+            ("OUTBOUND_DRAIN_SECONDS", "10"),
+            ("OUTBOUND_RECLAIM_INTERVAL_SECONDS", "1"),
+            ("USAGE_FLUSH_BATCH_SIZE", "100"),
+            ("USAGE_FLUSH_INTERVAL_SECONDS", "2"),
+            ("USAGE_BUFFER_MAX_RECORDS", "10000"),
+            ("GRAPH_HTTP_MAX_CONNECTIONS", "100"),
+            ("GRAPH_HTTP_MAX_CONNECTIONS_PER_HOST", "50"),
+            ("GRAPH_HTTP_DNS_CACHE_SECONDS", "300"),
+            ("GRAPH_HTTP_KEEPALIVE_SECONDS", "60"),
+            ("GRAPH_HTTP_TIMEOUT_SECONDS", "20"),
             ("SUPPORT_PHONE", "+5215551234567"),
         ),
     ),
@@ -85,8 +123,20 @@ COMMON_ENV_SECTIONS = (
             ("MONGO_DB", "impulso_chatbot"),
             ("MONGO_KNOWLEDGE_COLLECTION", "knowledge"),
             ("MONGO_CHAT_HISTORY_COLLECTION", "chat_history"),
+            ("MONGO_CHAT_HISTORY_ARCHIVE_COLLECTION", "chat_history_archive"),
+            ("CHAT_HISTORY_MAX_LIVE_MESSAGES", "50"),
             ("MONGO_LEADS_COLLECTION", "leads"),
             ("MONGO_USAGE_COLLECTION", "usage"),
+            ("MONGO_OUTBOUND_COLLECTION", "outbound_messages"),
+            ("MONGO_WEBHOOK_DEDUP_COLLECTION", "webhook_dedup"),
+            ("MONGO_ENSURE_INDEXES", "true"),
+            ("MONGO_MAX_POOL_SIZE", "100"),
+            ("MONGO_MIN_POOL_SIZE", "0"),
+            ("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"),
+            ("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"),
+            ("MONGO_COMPRESSORS", "zstd,zlib"),
+            ("MONGO_WRITE_CONCERN", ""),
+            ("MONGO_ANALYTICS_READ_PREFERENCE", "secondaryPreferred"),
         ),
     ),
 )
@@ -135,6 +185,11 @@ MODULE_ENV_SECTIONS = {
             (
                 ("OPENAI_REALTIME_URL", "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview"),
                 ("TWILIO_MEDIA_STREAM_URL", "wss://tu-dominio.dev/api/twilio/media-stream"),
+                ("REALTIME_POOL_SIZE", "2"),
+                ("REALTIME_POOL_MAX_IDLE_SECONDS", "300"),
+                ("VOICE_AUDIO_COALESCE_MS", "60"),
+                ("VOICE_AUDIO_COALESCE_MS_BY_TENANT", ""),
+                ("VOICE_TOOL_TIMEOUTS", "check_availability:10,create_event:25"),
             ),
         ),
     ),
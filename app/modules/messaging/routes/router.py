@@ -27,4 +27,4 @@ async def create_support_message(body: SupportMessageRequest, request: Request):
 async def close_support_message(body: CloseSupportRequest, request: Request):
     require_messaging_token(request)
     tenant_id = request.headers.get("tenant_id") or request.headers.get("tenant-id")
-    return close_support_conversation(body.conversation_id, tenant_id)
+    return await close_support_conversation(body.conversation_id, tenant_id)
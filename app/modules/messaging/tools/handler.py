@@ -3,22 +3,22 @@ from typing import Optional, Tuple
 from fastapi import HTTPException
 
 from app.shared.tools.chat_history import (
-    find_conversation_by_id,
-    get_conversation_document,
-    save_message,
-    set_support_active,
+    afind_conversation_by_id,
+    aget_conversation_document,
+    asave_message,
+    aset_support_active,
 )
 from app.shared.tools.outbound_messages import send_message_to_conversation
 
 
-def resolve_conversation(conversation_id: str, tenant_id: Optional[str]) -> Tuple[str, dict]:
+async def resolve_conversation(conversation_id: str, tenant_id: Optional[str]) -> Tuple[str, dict]:
     resolved_tenant_id = tenant_id
     conversation = None
 
     if resolved_tenant_id:
-        conversation = get_conversation_document(resolved_tenant_id, conversation_id)
+        conversation = await aget_conversation_document(resolved_tenant_id, conversation_id)
     else:
-        conversation = find_conversation_by_id(conversation_id)
+        conversation = await afind_conversation_by_id(conversation_id)
         if conversation:
             resolved_tenant_id = conversation.get("tenantId")
 
@@ -29,11 +29,11 @@ def resolve_conversation(conversation_id: str, tenant_id: Optional[str]) -> Tupl
 
 
 async def send_support_message(conversation_id: str, response: str, tenant_id: Optional[str]):
-    resolved_tenant_id, _ = resolve_conversation(conversation_id, tenant_id)
+    resolved_tenant_id, _ = await resolve_conversation(conversation_id, tenant_id)
 
     await send_message_to_conversation(conversation_id, response)
-    set_support_active(resolved_tenant_id, conversation_id, True)
-    save_message(resolved_tenant_id, conversation_id, "support", response)
+    await aset_support_active(resolved_tenant_id, conversation_id, True)
+    await asave_message(resolved_tenant_id, conversation_id, "support", response)
 
     return {
         "status": "success",
@@ -43,9 +43,9 @@ async def send_support_message(conversation_id: str, response: str, tenant_id: O
     }
 
 
-def close_support_conversation(conversation_id: str, tenant_id: Optional[str]):
-    resolved_tenant_id, _ = resolve_conversation(conversation_id, tenant_id)
-    set_support_active(resolved_tenant_id, conversation_id, False)
+async def close_support_conversation(conversation_id: str, tenant_id: Optional[str]):
+    resolved_tenant_id, _ = await resolve_conversation(conversation_id, tenant_id)
+    await aset_support_active(resolved_tenant_id, conversation_id, False)
 
     return {
         "status": "success",
@@ -1,10 +1,14 @@
 import logging
+from functools import partial
 from typing import Any, Dict
 
 from app.modules.meta.tools.service import meta_messaging_service
 from app.shared.config.settings import TENANT_ID
-from app.shared.tools.chat_history import is_support_active, save_message, set_conversation_name
-from app.shared.tools.chat_flow import process_text_message
+from app.shared.tools.chat_history import aload_conversation_state, asave_conversation_state
+from app.shared.tools.chat_flow import aprocess_text_message
+from app.shared.tools.message_coalescer import message_coalescer
+from app.shared.tools.message_dedup import message_deduplicator
+from app.shared.tools.outbound_messages import enqueue_outbound_message
 
 logger = logging.getLogger(__name__)
 
@@ -16,14 +20,37 @@ async def verify_webhook(mode: str, token: str, challenge: str):
     return None
 
 
+async def _answer_message(message_text: str, tenant_id: str, source: str, sender_id: str):
+    conversation_id = f"{source}_{sender_id}"
+    state = await aload_conversation_state(tenant_id, conversation_id)
+    if state.name in (None, "", sender_id):
+        # El nombre se pide a la Graph API hasta obtenerlo (si falla regresa el sender_id) y se guarda con el turno.
+        state.set_name(await meta_messaging_service.get_sender_name(sender_id, source))
+    if state.support_active:
+        state.add_message("user", message_text)
+        await asave_conversation_state(state)
+        return
+
+    answer = await aprocess_text_message(
+        message_text,
+        tenant_id,
+        conversation_id,
+        source=source,
+        state=state,
+    )
+    await enqueue_outbound_message(source, sender_id, answer)
+
+
 async def handle_webhook(body: Dict[str, Any], tenant_id: str = None):
+    """Encola cada mensaje en el worker de su conversacion y responde de inmediato a Meta."""
     object_type = str(body.get("object", "")).lower()
     if object_type not in ("page", "instagram"):
         return {"status": "ignored", "reason": "unsupported_object"}
 
     tenant_id = tenant_id or TENANT_ID
     source = "instagram" if object_type == "instagram" else "messenger"
-    processed = 0
+    queued = 0
+    duplicates = 0
 
     for entry in body.get("entry", []):
         for event in entry.get("messaging", []):
@@ -36,25 +63,17 @@ async def handle_webhook(body: Dict[str, Any], tenant_id: str = None):
             if not message_text:
                 continue
 
-            conversation_id = f"{source}_{sender_id}"
-            sender_name = await meta_messaging_service.get_sender_name(sender_id, source)
-            set_conversation_name(tenant_id, conversation_id, sender_name)
-            if is_support_active(tenant_id, conversation_id):
-                save_message(tenant_id, conversation_id, "user", message_text)
-                processed += 1
+            if not await message_deduplicator.claim(source, message.get("mid")):
+                duplicates += 1
                 continue
 
-            answer = process_text_message(
+            message_coalescer.add(
+                source,
+                f"{source}_{sender_id}",
                 message_text,
-                tenant_id,
-                conversation_id,
-                source=source,
-            )
-            await meta_messaging_service.send_text_message(
-                platform=source,
-                recipient_id=sender_id,
-                message=answer,
+                partial(_answer_message, tenant_id=tenant_id, source=source, sender_id=sender_id),
+                message_id=message.get("mid"),
             )
-            processed += 1
+            queued += 1
 
-    return {"status": "success", "processed": processed}
+    return {"status": "accepted", "queued": queued, "duplicates": duplicates}
@@ -16,6 +16,8 @@ from app.shared.config.settings import (
     META_PAGE_ID,
     META_VERIFY_TOKEN,
 )
+from app.shared.tools.http_clients import get_graph_session
+from app.shared.types.graph_api import GraphAPIError, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
@@ -237,18 +239,18 @@ class MetaMessagingService:
             url = f"{self.base_url}/{sender_id}"
             params = {"fields": "name", "access_token": token}
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        # Prefer full name when available, then username, then sender_id.
-                        name = (data.get("name") or "").strip()
-                        username = (data.get("username") or "").strip()
-                        return name or username or sender_id
-                    logger.warning(
-                        "[Meta] Graph API returned %s fetching sender %s on %s: %s",
-                        resp.status, sender_id, normalized, await resp.text(),
-                    )
+            session = get_graph_session()
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                if resp.status == 200:
+                    data = await resp.json()
+                    # Prefer full name when available, then username, then sender_id.
+                    name = (data.get("name") or "").strip()
+                    username = (data.get("username") or "").strip()
+                    return name or username or sender_id
+                logger.warning(
+                    "[Meta] Graph API returned %s fetching sender %s on %s: %s",
+                    resp.status, sender_id, normalized, await resp.text(),
+                )
         except Exception as exc:
             logger.warning("[Meta] Could not fetch sender name for %s on %s: %s", sender_id, normalized, exc)
         return sender_id
@@ -264,21 +266,23 @@ class MetaMessagingService:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/me/messages",
-                    json=payload,
-                    headers=self.get_headers(normalized_platform),
-                ) as response:
-                    result = await response.json()
-                    if response.status in (200, 201):
-                        logger.info("Meta message sent to %s (%s)", recipient_id, normalized_platform)
-                        return result
-                    logger.error("Meta send error: %s - %s", response.status, result)
-                    raise HTTPException(
-                        status_code=response.status,
-                        detail=f"Error de Meta API: {result.get('error', {}).get('message', 'Unknown error')}",
-                    )
+            session = get_graph_session()
+            async with session.post(
+                f"{self.base_url}/me/messages",
+                json=payload,
+                headers=self.get_headers(normalized_platform),
+            ) as response:
+                result = await response.json()
+                if response.status in (200, 201):
+                    logger.info("Meta message sent to %s (%s)", recipient_id, normalized_platform)
+                    return result
+                logger.error("Meta send error: %s - %s", response.status, result)
+                raise GraphAPIError(
+                    status_code=response.status,
+                    detail=f"Error de Meta API: {result.get('error', {}).get('message', 'Unknown error')}",
+                    error_code=result.get("error", {}).get("code"),
+                    retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                )
         except aiohttp.ClientError as exc:
             logger.error("Meta connection error: %s", str(exc))
             raise HTTPException(status_code=500, detail="Error de conexion con Meta API")
@@ -10,6 +10,18 @@ VOICE_PROMPT_ADDITION = (
 )
 
 
+def build_history_section(history, max_items: int = 10):
+    items = list(history or [])[-max_items:]
+    if not items:
+        return ""
+
+    lines = []
+    for item in items:
+        prefix = "Usuario:" if item["role"] == "user" else "Asistente:"
+        lines.append(f"{prefix} {item['content']}")
+    return "\n\nHISTORIAL RECIENTE DE LA CONVERSACION:\n" + "\n".join(lines)
+
+
 def build_voice_instructions(faiss_context: str, tenant_id: str, timezone: str = "UTC"):
     context_chunks = [chunk for chunk in [faiss_context] if chunk]
     context_section = ""
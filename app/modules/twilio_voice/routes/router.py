@@ -2,19 +2,26 @@ import asyncio
 import json
 import logging
 
+import orjson
 from fastapi import APIRouter, Request, WebSocket
 from fastapi.responses import Response
 
+from app.modules.twilio_voice.prompts.voice import build_history_section
+from app.modules.twilio_voice.tools.frames import extract_twilio_media_payload
 from app.modules.twilio_voice.tools.handler import (
-    REALTIME_TOOLS,
-    build_session_instructions,
+    close_call_tasks,
+    flush_call_audio,
+    get_audio_coalesce_ms,
+    get_session_instructions,
     listen_openai,
-    load_faiss_context,
+    load_call_history,
+    mark_caller_audio,
+    realtime_pool,
+    relay_call_audio,
+    stop_silence_watch,
     watch_silence,
 )
 from app.shared.config.settings import TENANT_ID, TWILIO_MEDIA_STREAM_URL
-from app.shared.tools.chat_history import get_conversation_history
-from app.shared.tools.realtime_ai import connect_openai
 from app.shared.types.call_session import CallSession
 
 logger = logging.getLogger(__name__)
@@ -39,92 +46,79 @@ async def twilio_media_stream(ws: WebSocket):
     await ws.accept()
     session = None
 
-    async for message in ws.iter_text():
-        data = json.loads(message)
-
-        if data["event"] == "start":
-            stream_sid = data["start"]["streamSid"]
-            custom_params = data["start"].get("customParameters", {})
-            caller_phone = custom_params.get("caller")
-            tenant_id = custom_params.get("tenant_id", TENANT_ID)
-
-            session = CallSession(stream_sid, tenant_id=tenant_id, caller_phone=caller_phone)
-            session.openai_ws = await connect_openai()
-
-            faiss_context = load_faiss_context(tenant_id)
-            instructions = build_session_instructions(faiss_context, tenant_id)
-
-            history = []
-            if caller_phone:
-                history = get_conversation_history(tenant_id, session.conversation_id)
-
-            asyncio.create_task(listen_openai(session, ws))
-            asyncio.create_task(watch_silence(session, ws))
-
-            await session.openai_ws.send(
-                json.dumps(
-                    {
-                        "type": "session.update",
-                        "session": {
-                            "turn_detection": {"type": "server_vad"},
-                            "input_audio_format": "g711_ulaw",
-                            "output_audio_format": "g711_ulaw",
-                            "voice": "verse",
-                            "instructions": instructions,
-                            "tools": REALTIME_TOOLS,
-                            "tool_choice": "auto",
-                            "input_audio_transcription": {"model": "whisper-1"},
-                        },
-                    }
+    try:
+        async for message in ws.iter_text():
+            payload = extract_twilio_media_payload(message)
+            data = None
+            if payload is None:
+                data = orjson.loads(message)
+                if data["event"] == "media":
+                    payload = data["media"]["payload"]
+
+            if payload is not None:
+                if session and session.openai_ws:
+                    mark_caller_audio(session)
+                    await relay_call_audio(session, payload)
+                continue
+
+            if data["event"] == "start":
+                stream_sid = data["start"]["streamSid"]
+                custom_params = data["start"].get("customParameters", {})
+                caller_phone = custom_params.get("caller")
+                tenant_id = custom_params.get("tenant_id", TENANT_ID)
+
+                session = CallSession(
+                    stream_sid,
+                    tenant_id=tenant_id,
+                    caller_phone=caller_phone,
+                    audio_coalesce_ms=get_audio_coalesce_ms(tenant_id),
+                )
+                session.openai_ws, instructions, history = await asyncio.gather(
+                    realtime_pool.acquire(),
+                    asyncio.to_thread(get_session_instructions, tenant_id),
+                    load_call_history(session),
                 )
-            )
-
-            if history:
-                for item in list(history)[-10:]:
-                    role = "user" if item["role"] == "user" else "assistant"
-                    await session.openai_ws.send(
-                        json.dumps(
-                            {
-                                "type": "conversation.item.create",
-                                "item": {
-                                    "type": "message",
-                                    "role": role,
-                                    "content": [{"type": "input_text", "text": item["content"]}],
-                                },
-                            }
-                        )
-                    )
 
-            await session.openai_ws.send(
-                json.dumps(
-                    {
-                        "type": "response.create",
-                        "response": {
-                            "modalities": ["audio", "text"],
-                            "instructions": "Saluda al usuario de forma amigable y breve.",
-                        },
-                    }
+                asyncio.create_task(listen_openai(session, ws))
+                watch_silence(session, ws)
+
+                await session.openai_ws.send(
+                    json.dumps(
+                        {
+                            "type": "session.update",
+                            "session": {
+                                "instructions": instructions + build_history_section(history),
+                            },
+                        }
+                    )
                 )
-            )
-            logger.info("Voice session started stream=%s tenant=%s", stream_sid, tenant_id)
-            continue
-
-        if data["event"] == "media" and session and session.openai_ws:
-            import time
-
-            session.last_audio_time = time.time()
-            await session.openai_ws.send(
-                json.dumps(
-                    {
-                        "type": "input_audio_buffer.append",
-                        "audio": data["media"]["payload"],
-                    }
+
+                await session.openai_ws.send(
+                    json.dumps(
+                        {
+                            "type": "response.create",
+                            "response": {
+                                "modalities": ["audio", "text"],
+                                "instructions": "Saluda al usuario de forma amigable y breve.",
+                            },
+                        }
+                    )
                 )
-            )
-            continue
-
-        if data["event"] == "stop":
-            logger.info("Voice session stopped stream=%s", session.stream_sid if session else "unknown")
-            if session and session.openai_ws:
-                await session.openai_ws.close()
-            break
+                logger.info("Voice session started stream=%s tenant=%s", stream_sid, tenant_id)
+                continue
+
+            if data["event"] == "mark":
+                if session:
+                    await flush_call_audio(session)
+                continue
+
+            if data["event"] == "stop":
+                logger.info("Voice session stopped stream=%s", session.stream_sid if session else "unknown")
+                if session and session.openai_ws:
+                    await flush_call_audio(session)
+                    await session.openai_ws.close()
+                break
+    finally:
+        if session:
+            stop_silence_watch(session)
+            await close_call_tasks(session)
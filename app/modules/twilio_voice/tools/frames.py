@@ -0,0 +1,54 @@
+"""Relay de frames de audio sin parsear el JSON completo.
+
+Los eventos `media` de Twilio y `response.audio.delta` de OpenAI llegan a ~50 por
+segundo por direccion. Solo se extrae el campo base64 y se inserta en un sobre JSON
+ya renderizado; cualquier mensaje que no encaje con el formato esperado regresa
+`None` y se procesa con el parseo normal.
+"""
+import json
+from typing import Optional
+
+_TWILIO_MEDIA_EVENT = '"event":"media"'
+_TWILIO_PAYLOAD_KEY = '"payload":"'
+_OPENAI_AUDIO_DELTA_PREFIX = '{"type":"response.audio.delta"'
+_OPENAI_DELTA_KEY = '"delta":"'
+_AUDIO_APPEND_PREFIX = '{"type":"input_audio_buffer.append","audio":"'
+_ENVELOPE_SUFFIX = '"}'
+
+
+def _extract_string_field(message: str, key: str) -> Optional[str]:
+    start = message.rfind(key)
+    if start < 0:
+        return None
+    start += len(key)
+    end = message.find('"', start)
+    if end < 0:
+        return None
+    value = message[start:end]
+    if "\\" in value:
+        return None
+    return value
+
+
+def extract_twilio_media_payload(message: str) -> Optional[str]:
+    if message.find(_TWILIO_MEDIA_EVENT, 0, 32) < 0:
+        return None
+    return _extract_string_field(message, _TWILIO_PAYLOAD_KEY)
+
+
+def extract_openai_audio_delta(message) -> Optional[str]:
+    if not isinstance(message, str) or not message.startswith(_OPENAI_AUDIO_DELTA_PREFIX):
+        return None
+    return _extract_string_field(message, _OPENAI_DELTA_KEY)
+
+
+def render_audio_append(payload: str) -> str:
+    return _AUDIO_APPEND_PREFIX + payload + _ENVELOPE_SUFFIX
+
+
+def twilio_media_prefix(stream_sid: str) -> str:
+    return '{"event":"media","streamSid":' + json.dumps(stream_sid) + ',"media":{"payload":"'
+
+
+def render_twilio_media(prefix: str, payload: str) -> str:
+    return prefix + payload + '"}}'
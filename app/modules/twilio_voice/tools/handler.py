@@ -1,100 +1,98 @@
 import asyncio
 import json
 import logging
+import time
+from collections import deque
 from datetime import datetime
 
+import orjson
 from fastapi import WebSocket
 
 from app.modules.twilio_voice.prompts.voice import build_voice_instructions
+from app.modules.twilio_voice.tools.frames import (
+    extract_openai_audio_delta,
+    render_audio_append,
+    render_twilio_media,
+    twilio_media_prefix,
+)
 from app.modules.whatsapp.tools.service import whatsapp_service
-from app.shared.config.settings import SUPPORT_PHONE, TENANT_ID, TIMEZONE
+from app.shared.config.settings import (
+    REALTIME_POOL_MAX_IDLE_SECONDS,
+    REALTIME_POOL_SIZE,
+    SUPPORT_PHONE,
+    TENANT_ID,
+    TIMEZONE,
+    VOICE_AUDIO_COALESCE_MS,
+    VOICE_AUDIO_COALESCE_MS_BY_TENANT,
+    VOICE_TOOL_TIMEOUTS,
+)
+from app.shared.tools.agent_tools import realtime_tool_schemas
 from app.shared.tools.availability import (
-    check_slot_availability,
+    acheck_slot_availability,
+    aget_availability_suggestions,
     format_availability_suggestions,
-    get_availability_suggestions,
 )
-from app.shared.tools.calendar import call_google_calendar
-from app.shared.tools.chat_history import get_conversation_history, save_message
-from app.shared.tools.leads import create_lead
-from app.shared.tools.retrieval import search_semantic
+from app.shared.tools.calendar import acall_google_calendar
+from app.shared.tools.chat_history import aget_conversation_history, asave_message
+from app.shared.tools.embeddings import get_shard_version
+from app.shared.tools.leads import acreate_lead
+from app.shared.tools.outbound_messages import enqueue_outbound_message
+from app.shared.tools.realtime_ai import RealtimeConnectionPool
+from app.shared.tools.retrieval import asearch_semantic, search_semantic
 from app.shared.types.call_session import CallSession
+from app.shared.utils.deadlines import DeadlineScheduler
 from app.shared.utils.documents import join_page_contents
+from app.shared.utils.metrics import register_metrics
 
 logger = logging.getLogger(__name__)
 
 SILENCE_TIMEOUT_SECONDS = 5
 
-REALTIME_TOOLS = [
-    {
-        "type": "function",
-        "name": "check_availability",
-        "description": "Consulta los horarios disponibles para agendar una cita.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "preferred_date": {
-                    "type": "string",
-                    "description": "Fecha preferida en formato YYYY-MM-DD.",
-                }
-            },
-            "required": [],
-        },
-    },
-    {
-        "type": "function",
-        "name": "create_event",
-        "description": "Crea una cita cuando ya tienes fecha, hora y correo confirmados.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "date": {"type": "string"},
-                "startTime": {"type": "string"},
-                "title": {"type": "string"},
-                "guestEmails": {"type": "array", "items": {"type": "string"}},
-            },
-            "required": ["date", "startTime", "title", "guestEmails"],
-        },
-    },
-    {
-        "type": "function",
-        "name": "capture_lead",
-        "description": "Guarda datos de un lead cuando el usuario muestra intencion de compra.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "name": {"type": "string"},
-                "email": {"type": "string"},
-                "phone": {"type": "string"},
-                "intent_level": {"type": "string", "enum": ["medium", "high"]},
-                "aditional_info": {"type": "string"},
-            },
-            "required": ["intent_level"],
-        },
-    },
-    {
-        "type": "function",
-        "name": "search_knowledge",
-        "description": "Busca informacion en la base de conocimiento de la empresa.",
-        "parameters": {
-            "type": "object",
-            "properties": {"query": {"type": "string"}},
-            "required": ["query"],
-        },
-    },
-    {
-        "type": "function",
-        "name": "escalate_support",
-        "description": "Escala la conversacion a un agente humano cuando el usuario lo solicita.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "user_phone": {"type": "string"},
-                "reason": {"type": "string"},
-            },
-            "required": ["user_phone", "reason"],
-        },
-    },
-]
+# tenant_id -> (version del shard FAISS, instrucciones de sesion ya construidas)
+_session_instructions_cache = {}
+
+# Milisegundos desde el evento "start" de Twilio hasta el primer audio del saludo.
+_first_audio_latencies_ms = deque(maxlen=500)
+
+
+def _first_audio_metrics():
+    samples = sorted(_first_audio_latencies_ms)
+    if not samples:
+        return {"samples": 0}
+    return {
+        "samples": len(samples),
+        "avg_ms": round(sum(samples) / len(samples), 1),
+        "p50_ms": round(samples[len(samples) // 2], 1),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1),
+        "max_ms": round(samples[-1], 1),
+    }
+
+
+register_metrics("voice_first_audio", _first_audio_metrics)
+
+# Un solo heap de deadlines para todas las llamadas: cada frame de audio solo mueve el deadline.
+silence_scheduler = DeadlineScheduler("voice_silence")
+register_metrics("voice_silence", silence_scheduler.stats)
+
+REALTIME_TOOLS = realtime_tool_schemas()
+
+# Configuracion de sesion comun a todos los tenants; se envia al abrir cada websocket del pool.
+BASE_SESSION_CONFIG = {
+    "turn_detection": {"type": "server_vad"},
+    "input_audio_format": "g711_ulaw",
+    "output_audio_format": "g711_ulaw",
+    "voice": "verse",
+    "tools": REALTIME_TOOLS,
+    "tool_choice": "auto",
+    "input_audio_transcription": {"model": "whisper-1"},
+}
+
+realtime_pool = RealtimeConnectionPool(
+    size=REALTIME_POOL_SIZE,
+    max_idle_seconds=REALTIME_POOL_MAX_IDLE_SECONDS,
+    base_session=BASE_SESSION_CONFIG,
+)
+register_metrics("realtime_pool", realtime_pool.stats)
 
 
 def build_session_instructions(faiss_context: str, tenant_id: str):
@@ -121,124 +119,242 @@ def load_faiss_context(tenant_id: str):
     return join_page_contents(documents)
 
 
-async def handle_tool_call(session: CallSession, function_name: str, arguments: dict) -> str:
+def get_session_instructions(tenant_id: str):
+    version = get_shard_version(tenant_id)
+    cached = _session_instructions_cache.get(tenant_id)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    instructions = build_session_instructions(load_faiss_context(tenant_id), tenant_id)
+    _session_instructions_cache[tenant_id] = (version, instructions)
+    logger.info("Voice session instructions precomputed tenant=%s version=%s", tenant_id, version)
+    return instructions
+
+
+async def load_call_history(session: CallSession):
+    if not session.caller_phone:
+        return []
+    return await aget_conversation_history(session.tenant_id or TENANT_ID, session.conversation_id)
+
+
+def get_audio_coalesce_ms(tenant_id: str) -> int:
+    return VOICE_AUDIO_COALESCE_MS_BY_TENANT.get(tenant_id, VOICE_AUDIO_COALESCE_MS)
+
+
+async def flush_call_audio(session: CallSession):
+    if session.audio_flush_handle is not None:
+        session.audio_flush_handle.cancel()
+        session.audio_flush_handle = None
+    payload = session.audio_buffer.flush()
+    if payload is not None and session.openai_ws:
+        await session.openai_ws.send(render_audio_append(payload))
+
+
+def _log_task_error(session: CallSession, name: str):
+    def callback(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Voice %s failed stream=%s: %s", name, session.stream_sid, str(task.exception()))
+
+    return callback
+
+
+def _start_audio_flush(session: CallSession):
+    session.audio_flush_task = asyncio.create_task(flush_call_audio(session))
+    session.audio_flush_task.add_done_callback(_log_task_error(session, "audio flush"))
+
+
+def _schedule_audio_flush(session: CallSession):
+    loop = asyncio.get_running_loop()
+    session.audio_flush_handle = loop.call_later(session.audio_buffer.window_ms / 1000, _start_audio_flush, session)
+
+
+async def relay_call_audio(session: CallSession, payload: str):
+    """Envia audio del llamante a OpenAI, agrupando frames segun la ventana del tenant."""
+    if not session.audio_buffer.enabled:
+        await session.openai_ws.send(render_audio_append(payload))
+        return
+
+    ready = session.audio_buffer.add(payload)
+    if ready is not None:
+        if session.audio_flush_handle is not None:
+            session.audio_flush_handle.cancel()
+            session.audio_flush_handle = None
+        await session.openai_ws.send(render_audio_append(ready))
+    elif session.audio_flush_handle is None:
+        # El temporizador acota la latencia cuando el llamante deja de enviar frames.
+        _schedule_audio_flush(session)
+
+
+def _record_first_audio(session: CallSession):
+    session.first_audio_at = time.monotonic()
+    latency_ms = (session.first_audio_at - session.started_at) * 1000
+    _first_audio_latencies_ms.append(latency_ms)
+    logger.info("Voice first audio stream=%s latency_ms=%.0f", session.stream_sid, latency_ms)
+
+
+async def _run_tool_call(session: CallSession, function_name: str, arguments: dict) -> str:
     tenant_id = session.tenant_id or TENANT_ID
 
-    try:
-        if function_name == "check_availability":
-            availability_data = get_availability_suggestions(
-                preferred_date=arguments.get("preferred_date"),
-                tenant_id=tenant_id,
-            )
-            if availability_data:
-                return format_availability_suggestions(availability_data)
-            return "No pude consultar los horarios disponibles ahora. Intenta mas tarde."
-
-        if function_name == "create_event":
-            event_date = arguments.get("date")
-            start_time_iso = arguments.get("startTime", "")
-            slot_available = False
-            if event_date and start_time_iso:
-                try:
-                    event_dt = datetime.fromisoformat(start_time_iso.replace("Z", "+00:00"))
-                    slot_available = check_slot_availability(
-                        event_date,
-                        event_dt.strftime("%H:%M"),
-                        tenant_id=tenant_id,
-                    )
-                except Exception as exc:
-                    logger.error("Voice slot verification error: %s", str(exc))
-
-            if slot_available:
-                event_payload = {**arguments, "tenantId": tenant_id}
-                result = call_google_calendar(event_payload)
-                create_lead(event_payload)
-                if result.get("status") == "success":
-                    return "Tu cita quedo registrada. Te enviaremos la confirmacion por correo."
-                if result.get("status") == "conflict":
-                    alternatives = get_availability_suggestions(
-                        preferred_date=event_date,
-                        tenant_id=tenant_id,
-                    )
-                    if alternatives:
-                        return f"Ese horario no esta disponible. {format_availability_suggestions(alternatives)}"
-                    return "Ese horario no esta disponible. Quieres ver otras opciones?"
-                return f"Hubo un problema al registrar la cita: {result.get('message', 'error desconocido')}."
-
-            alternatives = get_availability_suggestions(preferred_date=event_date, tenant_id=tenant_id)
-            if alternatives:
-                return f"Ese horario no esta disponible. {format_availability_suggestions(alternatives)}"
-            return "Ese horario no esta disponible. Por favor dime otra fecha u hora."
-
-        if function_name == "search_knowledge":
-            query = arguments.get("query", "")
-            if not query:
-                return "No recibi ninguna consulta para buscar."
-            documents = search_semantic(query, tenant_id)
-            if documents:
-                return f"Informacion encontrada:\n{join_page_contents(documents)}"
-            return "No encontre informacion relevante sobre ese tema en la base de conocimiento."
-
-        if function_name == "capture_lead":
-            if arguments.get("name") or arguments.get("email") or arguments.get("phone"):
-                create_lead({**arguments, "tenantId": tenant_id})
-                return "Listo, ya guarde tus datos. En breve alguien del equipo te contactara."
-            return "Necesito al menos tu nombre, correo o telefono para poder ayudarte mejor."
-
-        if function_name == "escalate_support":
-            user_phone = arguments.get("user_phone") or session.caller_phone
-            reason = arguments.get("reason", "Sin descripcion")
-
-            if not SUPPORT_PHONE:
-                logger.error("SUPPORT_PHONE is not configured")
-                return "Intente escalar a soporte, pero el numero de soporte no esta configurado."
-            if not user_phone:
-                return "Para escalar a soporte necesito tu numero de telefono."
-
-            message_to_support = (
-                f"[Escalamiento VOZ] Tenant: {tenant_id} | Conversation: {session.conversation_id}\n"
-                f"Usuario: {whatsapp_service.format_phone_number(user_phone)}\n"
-                f"Motivo: {reason}\n"
-            )
-            asyncio.create_task(
-                whatsapp_service.send_text_message(
-                    whatsapp_service.format_phone_number(SUPPORT_PHONE),
-                    message_to_support,
+    if function_name == "check_availability":
+        availability_data = await aget_availability_suggestions(
+            preferred_date=arguments.get("preferred_date"),
+            tenant_id=tenant_id,
+        )
+        if availability_data:
+            return format_availability_suggestions(availability_data)
+        return "No pude consultar los horarios disponibles ahora. Intenta mas tarde."
+
+    if function_name == "create_event":
+        event_date = arguments.get("date")
+        start_time_iso = arguments.get("startTime", "")
+        slot_available = False
+        if event_date and start_time_iso:
+            try:
+                event_dt = datetime.fromisoformat(start_time_iso.replace("Z", "+00:00"))
+                slot_available = await acheck_slot_availability(
+                    event_date,
+                    event_dt.strftime("%H:%M"),
+                    tenant_id=tenant_id,
                 )
+            except Exception as exc:
+                logger.error("Voice slot verification error: %s", str(exc))
+
+        if slot_available:
+            event_payload = {**arguments, "tenantId": tenant_id}
+            result, _ = await asyncio.gather(
+                acall_google_calendar(event_payload),
+                acreate_lead(event_payload),
             )
-            return "He notificado a nuestro equipo de soporte. Un agente te contactara pronto."
+            if result.get("status") == "success":
+                return "Tu cita quedo registrada. Te enviaremos la confirmacion por correo."
+            if result.get("status") == "conflict":
+                alternatives = await aget_availability_suggestions(
+                    preferred_date=event_date,
+                    tenant_id=tenant_id,
+                )
+                if alternatives:
+                    return f"Ese horario no esta disponible. {format_availability_suggestions(alternatives)}"
+                return "Ese horario no esta disponible. Quieres ver otras opciones?"
+            return f"Hubo un problema al registrar la cita: {result.get('message', 'error desconocido')}."
+
+        alternatives = await aget_availability_suggestions(preferred_date=event_date, tenant_id=tenant_id)
+        if alternatives:
+            return f"Ese horario no esta disponible. {format_availability_suggestions(alternatives)}"
+        return "Ese horario no esta disponible. Por favor dime otra fecha u hora."
+
+    if function_name == "search_knowledge":
+        query = arguments.get("query", "")
+        if not query:
+            return "No recibi ninguna consulta para buscar."
+        documents = await asearch_semantic(query, tenant_id)
+        if documents:
+            return f"Informacion encontrada:\n{join_page_contents(documents)}"
+        return "No encontre informacion relevante sobre ese tema en la base de conocimiento."
+
+    if function_name == "capture_lead":
+        if arguments.get("name") or arguments.get("email") or arguments.get("phone"):
+            await acreate_lead({**arguments, "tenantId": tenant_id})
+            return "Listo, ya guarde tus datos. En breve alguien del equipo te contactara."
+        return "Necesito al menos tu nombre, correo o telefono para poder ayudarte mejor."
+
+    if function_name == "escalate_support":
+        user_phone = arguments.get("user_phone") or session.caller_phone
+        reason = arguments.get("reason", "Sin descripcion")
+
+        if not SUPPORT_PHONE:
+            logger.error("SUPPORT_PHONE is not configured")
+            return "Intente escalar a soporte, pero el numero de soporte no esta configurado."
+        if not user_phone:
+            return "Para escalar a soporte necesito tu numero de telefono."
+
+        message_to_support = (
+            f"[Escalamiento VOZ] Tenant: {tenant_id} | Conversation: {session.conversation_id}\n"
+            f"Usuario: {whatsapp_service.format_phone_number(user_phone)}\n"
+            f"Motivo: {reason}\n"
+        )
+        await enqueue_outbound_message(
+            "whatsapp",
+            whatsapp_service.format_phone_number(SUPPORT_PHONE),
+            message_to_support,
+        )
+        return "He notificado a nuestro equipo de soporte. Un agente te contactara pronto."
+
+    logger.warning("Unknown voice tool: %s", function_name)
+    return "No pude ejecutar esa accion."
+
 
-        logger.warning("Unknown voice tool: %s", function_name)
-        return "No pude ejecutar esa accion."
+async def handle_tool_call(session: CallSession, function_name: str, arguments: dict) -> str:
+    # Cada herramienta corre con su propio timeout sin bloquear el relay de audio de otras llamadas.
+    timeout = VOICE_TOOL_TIMEOUTS.get(function_name, 10.0)
+    try:
+        return await asyncio.wait_for(_run_tool_call(session, function_name, arguments), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Voice tool timeout %s after %ss stream=%s", function_name, timeout, session.stream_sid)
+        return "La consulta esta tardando mas de lo normal. Intenta de nuevo en un momento."
     except Exception as exc:
         logger.exception("Voice tool error %s: %s", function_name, str(exc))
         return "Ocurrio un error al procesar la accion. Intenta de nuevo."
 
 
-async def watch_silence(session: CallSession, twilio_ws: WebSocket):
-    import time
+async def _complete_tool_call(session: CallSession, function_name: str, call_id: str, arguments: dict):
+    result_text = await handle_tool_call(session, function_name, arguments)
+    try:
+        await session.openai_ws.send(
+            json.dumps(
+                {
+                    "type": "conversation.item.create",
+                    "item": {
+                        "type": "function_call_output",
+                        "call_id": call_id,
+                        "output": result_text,
+                    },
+                }
+            )
+        )
+        await session.openai_ws.send(json.dumps({"type": "response.create"}))
+    except Exception as exc:
+        logger.warning("Could not send voice tool result %s stream=%s: %s", function_name, session.stream_sid, str(exc))
 
-    await asyncio.sleep(SILENCE_TIMEOUT_SECONDS)
-    while True:
-        await asyncio.sleep(1)
-        if session.last_audio_time is None:
-            continue
-        elapsed = time.time() - session.last_audio_time
-        if elapsed < SILENCE_TIMEOUT_SECONDS:
-            continue
 
-        logger.info("Voice silence detected. Closing stream=%s", session.stream_sid)
-        try:
-            await twilio_ws.send_json({"event": "clear", "streamSid": session.stream_sid})
-            await twilio_ws.close()
-        except Exception:
-            pass
-        try:
-            if session.openai_ws:
-                await session.openai_ws.close()
-        except Exception:
-            pass
-        break
+async def _close_silent_call(session: CallSession, twilio_ws: WebSocket):
+    logger.info("Voice silence detected. Closing stream=%s", session.stream_sid)
+    try:
+        await twilio_ws.send_json({"event": "clear", "streamSid": session.stream_sid})
+        await twilio_ws.close()
+    except Exception:
+        pass
+    try:
+        if session.openai_ws:
+            await session.openai_ws.close()
+    except Exception:
+        pass
+
+
+def watch_silence(session: CallSession, twilio_ws: WebSocket):
+    silence_scheduler.register(session.stream_sid, lambda: _close_silent_call(session, twilio_ws))
+
+
+def mark_caller_audio(session: CallSession):
+    silence_scheduler.touch(session.stream_sid, SILENCE_TIMEOUT_SECONDS)
+
+
+def stop_silence_watch(session: CallSession):
+    silence_scheduler.cancel(session.stream_sid)
+
+
+async def close_call_tasks(session: CallSession):
+    """Cancela el envio de audio pendiente y espera las herramientas en curso de la llamada."""
+    if session.audio_flush_handle is not None:
+        session.audio_flush_handle.cancel()
+        session.audio_flush_handle = None
+    if session.audio_flush_task is not None:
+        session.audio_flush_task.cancel()
+        await asyncio.gather(session.audio_flush_task, return_exceptions=True)
+        session.audio_flush_task = None
+
+    # Cada herramienta ya tiene su timeout; esperarlas evita cortar un lead o una notificacion a medias.
+    if session.tool_tasks:
+        await asyncio.gather(*session.tool_tasks, return_exceptions=True)
 
 
 async def listen_openai(session: CallSession, twilio_ws: WebSocket):
@@ -246,21 +362,24 @@ async def listen_openai(session: CallSession, twilio_ws: WebSocket):
     current_function_name = ""
     current_function_args = ""
     current_function_call_id = ""
+    media_prefix = twilio_media_prefix(session.stream_sid)
 
     async for raw_message in session.openai_ws:
-        data = json.loads(raw_message)
-        event_type = data.get("type", "")
-
-        if event_type == "response.audio.delta":
-            await twilio_ws.send_json(
-                {
-                    "event": "media",
-                    "streamSid": session.stream_sid,
-                    "media": {"payload": data["delta"]},
-                }
-            )
+        audio_delta = extract_openai_audio_delta(raw_message)
+        data = None
+        if audio_delta is None:
+            data = orjson.loads(raw_message)
+            if data.get("type") == "response.audio.delta":
+                audio_delta = data["delta"]
+
+        if audio_delta is not None:
+            if session.first_audio_at is None:
+                _record_first_audio(session)
+            await twilio_ws.send_text(render_twilio_media(media_prefix, audio_delta))
             continue
 
+        event_type = data.get("type", "")
+
         if event_type == "response.audio.done":
             await twilio_ws.send_json(
                 {
@@ -278,7 +397,7 @@ async def listen_openai(session: CallSession, twilio_ws: WebSocket):
         if event_type == "response.audio_transcript.done":
             final_text = data.get("transcript", current_assistant_text).strip()
             if final_text:
-                save_message(session.tenant_id or TENANT_ID, session.conversation_id, "assistant", final_text)
+                await asave_message(session.tenant_id or TENANT_ID, session.conversation_id, "assistant", final_text)
                 logger.info("Voice assistant: %s", final_text[:120])
             current_assistant_text = ""
             continue
@@ -286,7 +405,7 @@ async def listen_openai(session: CallSession, twilio_ws: WebSocket):
         if event_type == "conversation.item.input_audio_transcription.completed":
             user_text = data.get("transcript", "").strip()
             if user_text:
-                save_message(session.tenant_id or TENANT_ID, session.conversation_id, "user", user_text)
+                await asave_message(session.tenant_id or TENANT_ID, session.conversation_id, "user", user_text)
                 logger.info("Voice user: %s", user_text[:120])
             continue
 
@@ -312,20 +431,10 @@ async def listen_openai(session: CallSession, twilio_ws: WebSocket):
             except json.JSONDecodeError:
                 arguments = {}
 
-            result_text = await handle_tool_call(session, fn_name, arguments)
-            await session.openai_ws.send(
-                json.dumps(
-                    {
-                        "type": "conversation.item.create",
-                        "item": {
-                            "type": "function_call_output",
-                            "call_id": call_id,
-                            "output": result_text,
-                        },
-                    }
-                )
-            )
-            await session.openai_ws.send(json.dumps({"type": "response.create"}))
+            # La herramienta corre aparte para que este listener siga reenviando eventos de OpenAI.
+            task = asyncio.create_task(_complete_tool_call(session, fn_name, call_id, arguments))
+            session.tool_tasks.add(task)
+            task.add_done_callback(session.tool_tasks.discard)
 
             current_function_name = ""
             current_function_call_id = ""
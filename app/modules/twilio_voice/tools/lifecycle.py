@@ -0,0 +1,31 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from app.modules.twilio_voice.tools.handler import get_session_instructions, realtime_pool, silence_scheduler
+from app.shared.config.settings import TENANT_ID
+
+logger = logging.getLogger(__name__)
+
+
+async def _warm_session_instructions(tenant_id: str):
+    try:
+        await asyncio.to_thread(get_session_instructions, tenant_id)
+    except Exception as exc:
+        logger.warning("Could not precompute voice instructions for tenant=%s: %s", tenant_id, str(exc))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    del app
+    warm_task = asyncio.create_task(_warm_session_instructions(TENANT_ID))
+    await realtime_pool.start()
+    try:
+        yield
+    finally:
+        if not warm_task.done():
+            warm_task.cancel()
+        await realtime_pool.stop()
+        await silence_scheduler.stop()
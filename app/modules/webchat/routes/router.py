@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from app.modules.webchat.tools.handler import handle_query
+from app.modules.webchat.tools.handler import handle_query, stream_query
 from app.shared.middleware.rate_limit import limiter
 
 router = APIRouter()
@@ -25,9 +26,23 @@ async def query_endpoint(body: QueryRequest, request: Request):
         raise HTTPException(status_code=400, detail="tenant-id header is required")
 
     return {
-        "answer": handle_query(
+        "answer": await handle_query(
             body.question,
             tenant_id,
             body.conversation_id,
         )
     }
+
+
+@router.post("/query/stream")
+@limiter.limit("5/minute")
+async def query_stream_endpoint(body: QueryRequest, request: Request):
+    tenant_id = request.headers.get("tenant_id") or body.tenant_id
+    if not tenant_id:
+        raise HTTPException(status_code=400, detail="tenant-id header is required")
+
+    return StreamingResponse(
+        stream_query(body.question, tenant_id, body.conversation_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
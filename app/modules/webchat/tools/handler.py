@@ -1,10 +1,34 @@
-from app.shared.tools.chat_flow import process_text_message
+"""Web chat tools."""
+import json
+import logging
 
+from app.shared.tools.chat_flow import aprocess_text_message, astream_text_message
 
-def handle_query(question: str, tenant_id: str, conversation_id: str):
-    return process_text_message(
+logger = logging.getLogger(__name__)
+
+
+async def handle_query(question: str, tenant_id: str, conversation_id: str):
+    return await aprocess_text_message(
         question,
         tenant_id,
         conversation_id,
         source="web",
     )
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_query(question: str, tenant_id: str, conversation_id: str):
+    """Eventos SSE: `delta` por cada fragmento, `done` con la respuesta completa o `error`."""
+    answer = ""
+    try:
+        async for delta in astream_text_message(question, tenant_id, conversation_id, source="web"):
+            answer += delta
+            yield _sse_event("delta", {"text": delta})
+    except Exception as exc:
+        logger.error("Webchat stream error conversation=%s: %s", conversation_id, str(exc))
+        yield _sse_event("error", {"detail": "No se pudo generar la respuesta."})
+        return
+    yield _sse_event("done", {"answer": answer})
@@ -1,12 +1,17 @@
 import io
 import logging
+from functools import partial
 
 from openai import AsyncOpenAI
 
 from app.modules.whatsapp.tools.service import whatsapp_service
 from app.shared.config.settings import OPENAI_API_KEY, TENANT_ID
-from app.shared.tools.chat_history import is_support_active, save_message
-from app.shared.tools.chat_flow import process_text_message
+from app.shared.tools.chat_history import aload_conversation_state, asave_conversation_state
+from app.shared.tools.chat_flow import aprocess_text_message
+from app.shared.tools.conversation_workers import conversation_workers
+from app.shared.tools.message_coalescer import message_coalescer
+from app.shared.tools.message_dedup import message_deduplicator
+from app.shared.tools.outbound_messages import enqueue_outbound_message
 
 logger = logging.getLogger(__name__)
 
@@ -18,9 +23,49 @@ async def verify_webhook(mode: str, token: str, challenge: str):
     return None
 
 
+async def _answer_text(text: str, tenant_id: str, conversation_id: str, phone_number: str):
+    state = await aload_conversation_state(tenant_id, conversation_id)
+    if state.support_active:
+        state.add_message("user", text)
+        await asave_conversation_state(state)
+        return
+
+    answer = await aprocess_text_message(
+        text,
+        tenant_id,
+        conversation_id,
+        source="whatsapp",
+        state=state,
+    )
+    await enqueue_outbound_message("whatsapp", phone_number, answer)
+
+
+async def _answer_audio(audio_id: str, tenant_id: str, conversation_id: str, phone_number: str):
+    try:
+        audio_bytes = await whatsapp_service.download_media(audio_id)
+        audio_file = io.BytesIO(audio_bytes)
+        audio_file.name = "audio.ogg"
+
+        client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        transcript = await client.audio.transcriptions.create(
+            model="whisper-1",
+            file=audio_file,
+        )
+        await _answer_text(transcript.text, tenant_id, conversation_id, phone_number)
+    except Exception as exc:
+        logger.error("WhatsApp audio processing error: %s", str(exc))
+        await enqueue_outbound_message(
+            "whatsapp",
+            phone_number,
+            "No pude procesar tu mensaje de voz. Por favor escribelo.",
+        )
+
+
 async def handle_webhook(body, tenant_id: str = None):
+    """Encola cada mensaje en el worker de su conversacion y responde de inmediato a Meta."""
     tenant_id = tenant_id or TENANT_ID
-    processed = 0
+    queued = 0
+    duplicates = 0
 
     for entry in body.entry:
         for change in entry.changes:
@@ -32,54 +77,40 @@ async def handle_webhook(body, tenant_id: str = None):
                 continue
 
             for message in value.messages:
+                if not await message_deduplicator.claim("whatsapp", message.id):
+                    duplicates += 1
+                    continue
+
                 phone_number = whatsapp_service.format_phone_number(message.from_)
                 conversation_id = f"whatsapp_{phone_number}"
 
                 if message.type == "text" and message.text:
-                    if is_support_active(tenant_id, conversation_id):
-                        save_message(tenant_id, conversation_id, "user", message.text.body)
-                        processed += 1
-                        continue
-
-                    answer = process_text_message(
-                        message.text.body,
-                        tenant_id,
+                    message_coalescer.add(
+                        "whatsapp",
                         conversation_id,
-                        source="whatsapp",
+                        message.text.body,
+                        partial(
+                            _answer_text,
+                            tenant_id=tenant_id,
+                            conversation_id=conversation_id,
+                            phone_number=phone_number,
+                        ),
+                        message_id=message.id,
                     )
-                    await whatsapp_service.send_text_message(phone_number, answer)
-                    processed += 1
+                    queued += 1
                     continue
 
                 if message.type == "audio" and message.audio:
-                    try:
-                        audio_bytes = await whatsapp_service.download_media(message.audio.id)
-                        audio_file = io.BytesIO(audio_bytes)
-                        audio_file.name = "audio.ogg"
-
-                        client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-                        transcript = await client.audio.transcriptions.create(
-                            model="whisper-1",
-                            file=audio_file,
-                        )
-                        if is_support_active(tenant_id, conversation_id):
-                            save_message(tenant_id, conversation_id, "user", transcript.text)
-                            processed += 1
-                            continue
-
-                        answer = process_text_message(
-                            transcript.text,
-                            tenant_id,
-                            conversation_id,
-                            source="whatsapp",
-                        )
-                        await whatsapp_service.send_text_message(phone_number, answer)
-                        processed += 1
-                    except Exception as exc:
-                        logger.error("WhatsApp audio processing error: %s", str(exc))
-                        await whatsapp_service.send_text_message(
-                            phone_number,
-                            "No pude procesar tu mensaje de voz. Por favor escribelo.",
-                        )
-
-    return {"status": "success", "processed": processed}
+                    # Los textos en espera van primero para no alterar el orden de la conversacion.
+                    message_coalescer.flush(conversation_id)
+                    conversation_workers.submit(
+                        conversation_id,
+                        message_deduplicator.guard(
+                            "whatsapp",
+                            [message.id],
+                            partial(_answer_audio, message.audio.id, tenant_id, conversation_id, phone_number),
+                        ),
+                    )
+                    queued += 1
+
+    return {"status": "accepted", "queued": queued, "duplicates": duplicates}
@@ -10,6 +10,8 @@ from app.shared.config.settings import (
     WHATSAPP_PHONE_NUMBER_ID,
     WHATSAPP_VERIFY_TOKEN,
 )
+from app.shared.tools.http_clients import get_graph_session
+from app.shared.types.graph_api import GraphAPIError, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
@@ -45,21 +47,23 @@ class WhatsAppService:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/messages",
-                    json=payload,
-                    headers=self.get_headers(),
-                ) as response:
-                    result = await response.json()
-                    if response.status == 200:
-                        logger.info("WhatsApp message sent to %s", to)
-                        return result
-                    logger.error("WhatsApp send error: %s - %s", response.status, result)
-                    raise HTTPException(
-                        status_code=response.status,
-                        detail=f"Error de WhatsApp API: {result.get('error', {}).get('message', 'Unknown error')}",
-                    )
+            session = get_graph_session()
+            async with session.post(
+                f"{self.base_url}/messages",
+                json=payload,
+                headers=self.get_headers(),
+            ) as response:
+                result = await response.json()
+                if response.status == 200:
+                    logger.info("WhatsApp message sent to %s", to)
+                    return result
+                logger.error("WhatsApp send error: %s - %s", response.status, result)
+                raise GraphAPIError(
+                    status_code=response.status,
+                    detail=f"Error de WhatsApp API: {result.get('error', {}).get('message', 'Unknown error')}",
+                    error_code=result.get("error", {}).get("code"),
+                    retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                )
         except aiohttp.ClientError as exc:
             logger.error("WhatsApp connection error: %s", str(exc))
             raise HTTPException(status_code=500, detail="Error de conexion con WhatsApp API")
@@ -92,21 +96,23 @@ class WhatsAppService:
             payload["template"]["components"] = components
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/messages",
-                    json=payload,
-                    headers=self.get_headers(),
-                ) as response:
-                    result = await response.json()
-                    if response.status == 200:
-                        logger.info("WhatsApp template sent to %s", to)
-                        return result
-                    logger.error("WhatsApp template error: %s - %s", response.status, result)
-                    raise HTTPException(
-                        status_code=response.status,
-                        detail=f"Error de WhatsApp API: {result.get('error', {}).get('message', 'Unknown error')}",
-                    )
+            session = get_graph_session()
+            async with session.post(
+                f"{self.base_url}/messages",
+                json=payload,
+                headers=self.get_headers(),
+            ) as response:
+                result = await response.json()
+                if response.status == 200:
+                    logger.info("WhatsApp template sent to %s", to)
+                    return result
+                logger.error("WhatsApp template error: %s - %s", response.status, result)
+                raise GraphAPIError(
+                    status_code=response.status,
+                    detail=f"Error de WhatsApp API: {result.get('error', {}).get('message', 'Unknown error')}",
+                    error_code=result.get("error", {}).get("code"),
+                    retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                )
         except HTTPException:
             raise
         except Exception as exc:
@@ -120,23 +126,23 @@ class WhatsAppService:
         media_info_url = f"https://graph.facebook.com/{WHATSAPP_GRAPH_VERSION}/{media_id}"
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(media_info_url, headers=self.get_headers()) as response:
-                    if response.status != 200:
-                        raise HTTPException(status_code=response.status, detail="Error obteniendo URL del media")
-                    media_info = await response.json()
-                    media_url = media_info.get("url")
-
-                if not media_url:
-                    raise HTTPException(status_code=500, detail="URL del media no encontrada")
-
-                async with session.get(
-                    media_url,
-                    headers={"Authorization": f"Bearer {self.access_token}"},
-                ) as response:
-                    if response.status != 200:
-                        raise HTTPException(status_code=response.status, detail="Error descargando el media")
-                    return await response.read()
+            session = get_graph_session()
+            async with session.get(media_info_url, headers=self.get_headers()) as response:
+                if response.status != 200:
+                    raise HTTPException(status_code=response.status, detail="Error obteniendo URL del media")
+                media_info = await response.json()
+                media_url = media_info.get("url")
+
+            if not media_url:
+                raise HTTPException(status_code=500, detail="URL del media no encontrada")
+
+            async with session.get(
+                media_url,
+                headers={"Authorization": f"Bearer {self.access_token}"},
+            ) as response:
+                if response.status != 200:
+                    raise HTTPException(status_code=response.status, detail="Error descargando el media")
+                return await response.read()
         except aiohttp.ClientError as exc:
             logger.error("WhatsApp media download error: %s", str(exc))
             raise HTTPException(status_code=500, detail="Error de conexion descargando media")
@@ -0,0 +1,67 @@
+# Copia al archivo los mensajes de historial anteriores al archivo por conversacion, recorta el arreglo vivo
+# y marca la conversacion con `history_archived`. Hasta tener esa marca, las escrituras no recortan su arreglo.
+# Correr una vez al desplegar el historial acotado; se puede repetir sin duplicar mensajes.
+# Uso: python3 -m app.scripts.archive_chat_history [--dry-run]
+import argparse
+
+from app.shared.config.database import chat_history_archive_collection, chat_history_collection
+from app.shared.config.settings import CHAT_HISTORY_MAX_LIVE_MESSAGES
+
+
+def archive_conversation(conversation, dry_run: bool):
+    tenant_id = conversation.get("tenantId")
+    conversation_id = conversation.get("conversation_id")
+    first_archived = chat_history_archive_collection.find_one(
+        {"tenantId": tenant_id, "conversation_id": conversation_id},
+        {"hour": 1},
+        sort=[("hour", 1)],
+    )
+    cutoff = first_archived["hour"] if first_archived else None
+
+    # Los mensajes posteriores al primer archivado ya se guardaron al escribirse; los que no traen
+    # `hour` son anteriores al archivo y tambien se copian.
+    pending = [
+        {"tenantId": tenant_id, "conversation_id": conversation_id, **entry}
+        for entry in conversation.get("history") or []
+        if cutoff is None or not entry.get("hour") or entry["hour"] < cutoff
+    ]
+    oversized = len(conversation.get("history") or []) > CHAT_HISTORY_MAX_LIVE_MESSAGES
+    if dry_run:
+        return len(pending), oversized
+
+    if pending:
+        chat_history_archive_collection.insert_many(pending, ordered=True)
+    # Los mensajes agregados despues de leer la conversacion ya se archivaron al escribirse.
+    chat_history_collection.update_one(
+        {"_id": conversation["_id"]},
+        {
+            "$set": {"history_archived": True},
+            "$push": {"history": {"$each": [], "$slice": -CHAT_HISTORY_MAX_LIVE_MESSAGES}},
+        },
+    )
+    return len(pending), oversized
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archiva el historial existente y recorta los arreglos vivos.")
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta lo que se archivaria y recortaria.")
+    args = parser.parse_args()
+
+    conversations = archived = trimmed = 0
+    cursor = chat_history_collection.find(
+        {"history_archived": {"$ne": True}, "history.0": {"$exists": True}},
+        {"tenantId": 1, "conversation_id": 1, "history": 1},
+    )
+    for conversation in cursor:
+        pending, oversized = archive_conversation(conversation, args.dry_run)
+        conversations += 1
+        archived += pending
+        trimmed += int(oversized)
+
+    action = "Se archivarian" if args.dry_run else "Archivados"
+    print(f"Conversaciones revisadas: {conversations}")
+    print(f"{action} {archived} mensajes; arreglos recortados a {CHAT_HISTORY_MAX_LIVE_MESSAGES}: {trimmed}")
+
+
+if __name__ == "__main__":
+    main()
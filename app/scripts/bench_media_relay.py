@@ -0,0 +1,114 @@
+# Benchmark del relay de audio Twilio <-> OpenAI Realtime (solo parseo y serializacion).
+# Uso: python3 -m app.scripts.bench_media_relay [--frames 200000]
+import argparse
+import base64
+import json
+import os
+import time
+
+from app.modules.twilio_voice.tools.frames import (
+    extract_openai_audio_delta,
+    extract_twilio_media_payload,
+    render_audio_append,
+    render_twilio_media,
+    twilio_media_prefix,
+)
+
+FRAMES_PER_SECOND_PER_DIRECTION = 50
+STREAM_SID = "MZ00000000000000000000000000000000"
+
+
+def build_sample_frames():
+    # 20 ms de mu-law a 8 kHz = 160 bytes.
+    payload = base64.b64encode(os.urandom(160)).decode()
+    twilio_frame = json.dumps(
+        {
+            "event": "media",
+            "sequenceNumber": "42",
+            "media": {"track": "inbound", "chunk": "41", "timestamp": "820", "payload": payload},
+            "streamSid": STREAM_SID,
+        },
+        separators=(",", ":"),
+    )
+    openai_frame = json.dumps(
+        {
+            "type": "response.audio.delta",
+            "event_id": "event_AAAAAAAAAAAAAAAAAAAAA",
+            "response_id": "resp_AAAAAAAAAAAAAAAAAAAAA",
+            "item_id": "item_AAAAAAAAAAAAAAAAAAAAA",
+            "output_index": 0,
+            "content_index": 0,
+            "delta": payload,
+        },
+        separators=(",", ":"),
+    )
+    return twilio_frame, openai_frame
+
+
+def baseline_inbound(message):
+    data = json.loads(message)
+    if data["event"] == "media":
+        return json.dumps({"type": "input_audio_buffer.append", "audio": data["media"]["payload"]})
+    return None
+
+
+def baseline_outbound(message):
+    data = json.loads(message)
+    if data.get("type", "") == "response.audio.delta":
+        # Starlette send_json serializa con json.dumps.
+        return json.dumps({"event": "media", "streamSid": STREAM_SID, "media": {"payload": data["delta"]}})
+    return None
+
+
+def fast_inbound(message):
+    return render_audio_append(extract_twilio_media_payload(message))
+
+
+MEDIA_PREFIX = twilio_media_prefix(STREAM_SID)
+
+
+def fast_outbound(message):
+    return render_twilio_media(MEDIA_PREFIX, extract_openai_audio_delta(message))
+
+
+def time_per_frame(function, message, frames):
+    started = time.process_time()
+    for _ in range(frames):
+        function(message)
+    return (time.process_time() - started) / frames
+
+
+def calls_per_core(inbound_seconds, outbound_seconds):
+    seconds_per_call_second = FRAMES_PER_SECOND_PER_DIRECTION * (inbound_seconds + outbound_seconds)
+    return 1 / seconds_per_call_second
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el relay de frames con parseo JSON completo vs fast path.")
+    parser.add_argument("--frames", type=int, default=200000, help="Frames por medicion. Default: 200000")
+    args = parser.parse_args()
+
+    twilio_frame, openai_frame = build_sample_frames()
+    assert json.loads(fast_inbound(twilio_frame)) == json.loads(baseline_inbound(twilio_frame))
+    assert json.loads(fast_outbound(openai_frame)) == json.loads(baseline_outbound(openai_frame))
+
+    results = {}
+    for label, inbound, outbound in (
+        ("json (antes)", baseline_inbound, baseline_outbound),
+        ("fast path (despues)", fast_inbound, fast_outbound),
+    ):
+        inbound_seconds = time_per_frame(inbound, twilio_frame, args.frames)
+        outbound_seconds = time_per_frame(outbound, openai_frame, args.frames)
+        results[label] = (inbound_seconds, outbound_seconds)
+
+    print(f"Frames por medicion: {args.frames} ({FRAMES_PER_SECOND_PER_DIRECTION} frames/s por direccion por llamada)")
+    print(f"{'modo':<22}{'entrada us':>12}{'salida us':>12}{'llamadas/core':>16}")
+    for label, (inbound_seconds, outbound_seconds) in results.items():
+        print(
+            f"{label:<22}{inbound_seconds * 1e6:>12.2f}{outbound_seconds * 1e6:>12.2f}"
+            f"{calls_per_core(inbound_seconds, outbound_seconds):>16.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
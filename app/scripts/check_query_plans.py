@@ -0,0 +1,119 @@
+# Ejecuta explain() sobre las consultas de la app y falla si el plan ganador de alguna no usa indice (IXSCAN o IDHACK).
+# Uso: python3 -m app.scripts.check_query_plans [--ensure-indexes]
+import argparse
+import sys
+from datetime import datetime
+
+from app.shared.config.database import db
+from app.shared.config.indexes import ensure_indexes_sync
+from app.shared.config.settings import (
+    MONGO_CHAT_HISTORY_ARCHIVE_COLLECTION,
+    MONGO_CHAT_HISTORY_COLLECTION,
+    MONGO_KNOWLEDGE_COLLECTION,
+    MONGO_OUTBOUND_COLLECTION,
+    MONGO_USAGE_COLLECTION,
+)
+from app.shared.tools.chat_history import HISTORY_PROJECTION, STATE_PROJECTION, _conversation_filter
+from app.shared.tools.embeddings import _tenant_filter
+from app.shared.tools.outbound_queue import STATUS_PENDING
+from app.shared.tools.usage_tracker import _conversation_usage_filter, _usage_since_filter
+
+TENANT_ID = "plan_check_tenant"
+CONVERSATION_ID = "plan_check_conversation"
+
+
+def _find_plan(collection_name, query, projection=None, sort=None):
+    cursor = db[collection_name].find(query, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    return cursor.limit(1).explain()
+
+
+def _aggregate_plan(collection_name, match):
+    return db.command("aggregate", collection_name, pipeline=[{"$match": match}], explain=True)
+
+
+def build_checks():
+    return [
+        ("chat_history: historial por conversacion", lambda: _find_plan(
+            MONGO_CHAT_HISTORY_COLLECTION, _conversation_filter(TENANT_ID, CONVERSATION_ID), HISTORY_PROJECTION,
+        )),
+        ("chat_history: estado del turno", lambda: _find_plan(
+            MONGO_CHAT_HISTORY_COLLECTION, _conversation_filter(TENANT_ID, CONVERSATION_ID), STATE_PROJECTION,
+        )),
+        ("chat_history: find_conversation_by_id", lambda: _find_plan(
+            MONGO_CHAT_HISTORY_COLLECTION, {"conversation_id": CONVERSATION_ID},
+        )),
+        ("chat_history_archive: primer mensaje archivado", lambda: _find_plan(
+            MONGO_CHAT_HISTORY_ARCHIVE_COLLECTION,
+            {"tenantId": TENANT_ID, "conversation_id": CONVERSATION_ID},
+            sort=[("hour", 1)],
+        )),
+        ("usage: estadisticas por tenant/fuente", lambda: _aggregate_plan(
+            MONGO_USAGE_COLLECTION, _usage_since_filter(TENANT_ID, 30),
+        )),
+        ("usage: uso por conversacion", lambda: _aggregate_plan(
+            MONGO_USAGE_COLLECTION, _conversation_usage_filter(TENANT_ID, CONVERSATION_ID),
+        )),
+        ("knowledge: shard FAISS por tenant", lambda: _find_plan(
+            MONGO_KNOWLEDGE_COLLECTION, _tenant_filter(TENANT_ID),
+        )),
+        ("knowledge: regenerate_faiss por tenant", lambda: _find_plan(
+            MONGO_KNOWLEDGE_COLLECTION, {"tenantId": TENANT_ID},
+        )),
+        ("outbound_messages: recuperacion de pendientes", lambda: _find_plan(
+            MONGO_OUTBOUND_COLLECTION,
+            {"status": STATUS_PENDING, "locked_until": {"$lte": datetime.utcnow()}},
+            sort=[("created_at", 1)],
+        )),
+    ]
+
+
+def _plan_stages(node, in_winning_plan=False):
+    """Etapas del plan ganador, en cualquier nivel del documento de explain."""
+    if isinstance(node, dict):
+        if in_winning_plan and "stage" in node:
+            yield node["stage"]
+        for key, value in node.items():
+            yield from _plan_stages(value, in_winning_plan or key == "winningPlan")
+    elif isinstance(node, list):
+        for item in node:
+            yield from _plan_stages(item, in_winning_plan)
+
+
+# Etapas que prueban que el plan usa un indice. Un plan EOF (coleccion inexistente) no prueba nada.
+INDEX_STAGES = {"IXSCAN", "IDHACK"}
+
+
+def plan_status(stages) -> str:
+    if "COLLSCAN" in stages:
+        return "COLLSCAN"
+    if not stages & INDEX_STAGES:
+        return "SIN_INDICE"
+    return "ok"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica que las consultas de la app usen indices.")
+    parser.add_argument("--ensure-indexes", action="store_true", help="Crea los indices declarados antes de verificar.")
+    args = parser.parse_args()
+
+    if args.ensure_indexes:
+        ensure_indexes_sync(db)
+
+    failures = 0
+    for label, explain in build_checks():
+        stages = set(_plan_stages(explain()))
+        status = plan_status(stages)
+        failures += status != "ok"
+        print(f"{status:<12}{label}  [{', '.join(sorted(stages))}]")
+
+    # leads solo recibe inserts (leads.create_lead); no tiene consultas que verificar.
+    if failures:
+        print(f"\n{failures} consultas sin indice")
+        sys.exit(1)
+    print("\nTodas las consultas usan indice")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# Reporte de tokens del prompt de sistema por perfil: original vs compilado.
+# Uso: python3 -m app.scripts.prompt_report [--sections] [--timezone America/Mexico_City]
+import argparse
+
+from app.shared.config.settings import TIMEZONE
+from app.shared.prompts.compiler import BASE_ADDONS, SPECIALIZATION_ADDONS, compile_system_prompt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Muestra el ahorro de tokens del prompt compilado por perfil.")
+    parser.add_argument("--sections", action="store_true", help="Detalla los tokens de cada seccion.")
+    parser.add_argument("--timezone", type=str, default=TIMEZONE, help=f"Timezone del prompt. Default: {TIMEZONE}")
+    args = parser.parse_args()
+
+    compiled_prompts = [
+        compile_system_prompt(base, profile, args.timezone)
+        for base in ["general", *BASE_ADDONS]
+        for profile in ["", *SPECIALIZATION_ADDONS]
+    ]
+
+    print(f"{'base:perfil':<28}{'original':>10}{'compilado':>11}{'ahorro':>9}{'%':>7}")
+    for compiled in compiled_prompts:
+        label = f"{compiled.base}:{compiled.profile or '-'}"
+        percent = 100 * compiled.saved_tokens / compiled.raw_tokens if compiled.raw_tokens else 0
+        print(
+            f"{label:<28}{compiled.raw_tokens:>10}{compiled.tokens:>11}{compiled.saved_tokens:>9}"
+            f"{percent:>6.1f}%"
+        )
+
+    if not args.sections:
+        return
+
+    # Se detalla la combinacion mas grande.
+    largest = max(compiled_prompts, key=lambda compiled: compiled.raw_tokens)
+    print(f"\nSecciones de {largest.base}:{largest.profile or '-'}")
+    print(f"{'origen':<18}{'original':>10}{'compilado':>11}  seccion")
+    for section in sorted(largest.sections, key=lambda section: section.raw_tokens, reverse=True):
+        print(f"{section.source:<18}{section.raw_tokens:>10}{section.tokens:>11}  {section.title[:60]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,243 @@
-from pymongo import MongoClient
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, monitoring
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
 
 from app.shared.config.settings import (
+    MONGO_ANALYTICS_READ_PREFERENCE,
+    MONGO_CHAT_HISTORY_ARCHIVE_COLLECTION,
     MONGO_CHAT_HISTORY_COLLECTION,
+    MONGO_COMPRESSORS,
     MONGO_DB,
     MONGO_KNOWLEDGE_COLLECTION,
     MONGO_LEADS_COLLECTION,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_OUTBOUND_COLLECTION,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
     MONGO_URI,
     MONGO_USAGE_COLLECTION,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_WEBHOOK_DEDUP_COLLECTION,
+    MONGO_WRITE_CONCERN,
     validate_database_settings,
 )
+from app.shared.utils.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+class MongoPoolMonitor(monitoring.ConnectionPoolListener):
+    """Mide cuanto esperan las operaciones por una conexion libre del pool (sync y async).
+
+    El driver emite el inicio y el fin del checkout en el mismo hilo, asi que el inicio
+    se guarda en un `threading.local`.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_timeouts = 0
+        self.in_use = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.pool_clears = 0
+
+    def _record_wait(self) -> float:
+        started_at = getattr(self._local, "started_at", None)
+        self._local.started_at = None
+        return (time.monotonic() - started_at) * 1000 if started_at is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started_at = time.monotonic()
+
+    def connection_checked_out(self, event):
+        wait_ms = self._record_wait()
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def connection_check_out_failed(self, event):
+        self._record_wait()
+        with self._lock:
+            self.checkout_failures += 1
+            if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+                self.checkout_timeouts += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_pool_size": MONGO_MAX_POOL_SIZE,
+                "max_connections": 2 * MONGO_MAX_POOL_SIZE,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "checkout_timeouts": self.checkout_timeouts,
+                "wait_ms_avg": round(self.wait_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_ms_max, 3),
+                "pool_clears": self.pool_clears,
+            }
+
+
+class MongoDatabase:
+    """Clientes de Mongo (sync y async) con la configuracion del pool.
+
+    La app los abre en el lifespan; los scripts los crean al primer uso. Las colecciones
+    de este modulo son proxies que resuelven contra el cliente vigente. Despues de `close()`
+    usarlos falla en lugar de reabrir en silencio; solo un `open()` explicito los reabre.
+    Cada cliente tiene su propio pool de hasta `MONGO_MAX_POOL_SIZE` conexiones.
+    """
+
+    def __init__(self):
+        self.pool_monitor = MongoPoolMonitor()
+        self.generation = 0
+        self._closed = False
+        self._client: Optional[MongoClient] = None
+        self._async_client: Optional[AsyncIOMotorClient] = None
+
+    def client_options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {
+            "maxPoolSize": MONGO_MAX_POOL_SIZE,
+            "minPoolSize": MONGO_MIN_POOL_SIZE,
+            "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "event_listeners": [self.pool_monitor],
+        }
+        if MONGO_COMPRESSORS:
+            # El driver ignora (con warning) los compresores cuyo paquete no esta instalado.
+            options["compressors"] = ",".join(MONGO_COMPRESSORS)
+        if MONGO_WRITE_CONCERN:
+            options["w"] = int(MONGO_WRITE_CONCERN) if MONGO_WRITE_CONCERN.isdigit() else MONGO_WRITE_CONCERN
+        return options
+
+    def open(self):
+        self._closed = False
+        if self._client is not None:
+            return
+        validate_database_settings()
+        options = self.client_options()
+        self._client = MongoClient(MONGO_URI, **options)
+        self._async_client = AsyncIOMotorClient(MONGO_URI, **options)
+        self.generation += 1
+        logger.info(
+            "Mongo clients created max_pool=%s min_pool=%s wait_queue_timeout_ms=%s compressors=%s",
+            MONGO_MAX_POOL_SIZE,
+            MONGO_MIN_POOL_SIZE,
+            MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            ",".join(MONGO_COMPRESSORS) or "-",
+        )
+
+    def close(self):
+        self._closed = True
+        if self._client is None:
+            return
+        self._client.close()
+        self._async_client.close()
+        self._client = None
+        self._async_client = None
+        # Los proxies vuelven a resolver y fallan en lugar de usar un cliente cerrado.
+        self.generation += 1
+        logger.info("Mongo clients closed")
+
+    def _ensure_open(self):
+        if self._closed:
+            raise RuntimeError("Mongo clients are closed; call mongo.open() to reopen them")
+        self.open()
+
+    @property
+    def db(self):
+        self._ensure_open()
+        return self._client[MONGO_DB]
+
+    @property
+    def async_db(self):
+        self._ensure_open()
+        return self._async_client[MONGO_DB]
+
+    def analytics_collection(self, name: str):
+        """Coleccion para reportes: lee de secundarios si hay, para no cargar al primario."""
+        read_preference = READ_PREFERENCES.get(MONGO_ANALYTICS_READ_PREFERENCE, SecondaryPreferred)()
+        return self.db.get_collection(name, read_preference=read_preference)
+
+
+class _Lazy:
+    """Proxy de un cliente, base o coleccion que se resuelve al primer uso y tras reabrir el cliente."""
+
+    def __init__(self, resolve: Callable[[], Any]):
+        self._resolve = resolve
+        self._generation = None
+        self._target = None
+
+    def _get(self):
+        if self._target is None or self._generation != mongo.generation:
+            self._target = self._resolve()
+            self._generation = mongo.generation
+        return self._target
+
+    def __getattr__(self, name: str):
+        return getattr(self._get(), name)
+
+    def __getitem__(self, name: str):
+        return self._get()[name]
+
+
+mongo = MongoDatabase()
+register_metrics("mongo_pool", mongo.pool_monitor.stats)
 
-validate_database_settings()
+db = _Lazy(lambda: mongo.db)
+knowledge_collection = _Lazy(lambda: mongo.db[MONGO_KNOWLEDGE_COLLECTION])
+chat_history_collection = _Lazy(lambda: mongo.db[MONGO_CHAT_HISTORY_COLLECTION])
+chat_history_archive_collection = _Lazy(lambda: mongo.db[MONGO_CHAT_HISTORY_ARCHIVE_COLLECTION])
+leads_collection = _Lazy(lambda: mongo.db[MONGO_LEADS_COLLECTION])
+usage_collection = _Lazy(lambda: mongo.db[MONGO_USAGE_COLLECTION])
+usage_analytics_collection = _Lazy(lambda: mongo.analytics_collection(MONGO_USAGE_COLLECTION))
 
-client = MongoClient(MONGO_URI)
-db = client[MONGO_DB]
-knowledge_collection = db[MONGO_KNOWLEDGE_COLLECTION]
-chat_history_collection = db[MONGO_CHAT_HISTORY_COLLECTION]
-leads_collection = db[MONGO_LEADS_COLLECTION]
-usage_collection = db[MONGO_USAGE_COLLECTION]
+async_db = _Lazy(lambda: mongo.async_db)
+async_chat_history_collection = _Lazy(lambda: mongo.async_db[MONGO_CHAT_HISTORY_COLLECTION])
+async_chat_history_archive_collection = _Lazy(lambda: mongo.async_db[MONGO_CHAT_HISTORY_ARCHIVE_COLLECTION])
+async_leads_collection = _Lazy(lambda: mongo.async_db[MONGO_LEADS_COLLECTION])
+async_usage_collection = _Lazy(lambda: mongo.async_db[MONGO_USAGE_COLLECTION])
+async_outbound_collection = _Lazy(lambda: mongo.async_db[MONGO_OUTBOUND_COLLECTION])
+async_webhook_dedup_collection = _Lazy(lambda: mongo.async_db[MONGO_WEBHOOK_DEDUP_COLLECTION])
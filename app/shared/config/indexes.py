@@ -0,0 +1,69 @@
+"""Indices de Mongo que necesitan las consultas de la app.
+
+Cada indice corresponde a un patron de acceso concreto; si se agrega una consulta nueva,
+declara aqui su indice y agregala a `app/scripts/check_query_plans.py`.
+"""
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+from app.shared.config.settings import (
+    MONGO_CHAT_HISTORY_ARCHIVE_COLLECTION,
+    MONGO_CHAT_HISTORY_COLLECTION,
+    MONGO_KNOWLEDGE_COLLECTION,
+    MONGO_OUTBOUND_COLLECTION,
+    MONGO_USAGE_COLLECTION,
+    MONGO_WEBHOOK_DEDUP_COLLECTION,
+    WEBHOOK_DEDUP_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    MONGO_CHAT_HISTORY_COLLECTION: [
+        # Lecturas y upserts por conversacion (chat_history._conversation_filter).
+        IndexModel([("tenantId", ASCENDING), ("conversation_id", ASCENDING)]),
+        # find_conversation_by_id cuando la API de mensajeria no recibe tenant.
+        IndexModel([("conversation_id", ASCENDING)]),
+    ],
+    MONGO_CHAT_HISTORY_ARCHIVE_COLLECTION: [
+        # Primer mensaje archivado de una conversacion (scripts/archive_chat_history.py).
+        IndexModel([("tenantId", ASCENDING), ("conversation_id", ASCENDING), ("hour", ASCENDING)]),
+    ],
+    MONGO_USAGE_COLLECTION: [
+        # Estadisticas por tenant y por fuente en una ventana de dias.
+        IndexModel([("tenant_id", ASCENDING), ("timestamp", ASCENDING)]),
+        # Uso acumulado de una conversacion.
+        IndexModel([("tenant_id", ASCENDING), ("conversation_id", ASCENDING)]),
+    ],
+    MONGO_KNOWLEDGE_COLLECTION: [
+        # Construccion de shards FAISS por tenant; el filtro acepta ambos nombres de campo con $or.
+        IndexModel([("tenantId", ASCENDING)]),
+        IndexModel([("tenant_id", ASCENDING)]),
+    ],
+    MONGO_OUTBOUND_COLLECTION: [
+        # Recuperacion de envios: igualdad en status, orden por created_at, rango en locked_until.
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING), ("locked_until", ASCENDING)]),
+    ],
+    MONGO_WEBHOOK_DEDUP_COLLECTION: [
+        # Expira los IDs reclamados de webhooks.
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=int(WEBHOOK_DEDUP_TTL_SECONDS)),
+    ],
+}
+
+
+async def ensure_indexes(database):
+    """Crea los indices que falten; un fallo en una coleccion no detiene el arranque."""
+    for collection_name, indexes in INDEXES.items():
+        try:
+            created = await database[collection_name].create_indexes(indexes)
+            logger.info("Mongo indexes ensured collection=%s indexes=%s", collection_name, ",".join(created))
+        except PyMongoError as exc:
+            logger.error("Could not ensure Mongo indexes collection=%s: %s", collection_name, str(exc))
+
+
+def ensure_indexes_sync(database):
+    for collection_name, indexes in INDEXES.items():
+        database[collection_name].create_indexes(indexes)
@@ -20,6 +20,16 @@ def get_env_list(*names: str, default=None):
     return [item.strip() for item in value.split(",") if item.strip()]
 
 
+def get_env_mapping(*names: str, default=None, cast=str):
+    """Lee pares `clave:valor` separados por comas, p. ej. `tenant_a:80,tenant_b:40`."""
+    mapping = dict(default or {})
+    for item in get_env_list(*names):
+        key, separator, value = item.partition(":")
+        if separator and key.strip():
+            mapping[key.strip()] = cast(value.strip())
+    return mapping
+
+
 def build_cors_origins():
     if APP_ENV != "production":
         return CORS_ALLOW_ORIGINS
@@ -49,12 +59,68 @@ APP_ENV = get_env("APP_ENV", default="development").strip().lower()
 
 OPENAI_API_KEY = get_env("OPENAI_API_KEY")
 OPENAI_MODEL = get_env("OPENAI_MODEL", default="gpt-4o-mini")
+# Tokens maximos de historial + contexto de la empresa por turno; se puede ajustar por tenant.
+CONTEXT_TOKEN_BUDGET = int(get_env("CONTEXT_TOKEN_BUDGET", default="3000"))
+CONTEXT_TOKEN_BUDGET_BY_TENANT = get_env_mapping("CONTEXT_TOKEN_BUDGET_BY_TENANT", cast=int)
+# Parte del presupuesto reservada al historial; lo que no use pasa a los documentos.
+CONTEXT_HISTORY_SHARE = float(get_env("CONTEXT_HISTORY_SHARE", default="0.4"))
 OPENAI_REALTIME_URL = get_env("OPENAI_REALTIME_URL")
+# Pool de websockets Realtime precalentados para contestar llamadas sin esperar el handshake.
+REALTIME_POOL_SIZE = int(get_env("REALTIME_POOL_SIZE", default="2"))
+REALTIME_POOL_MAX_IDLE_SECONDS = float(get_env("REALTIME_POOL_MAX_IDLE_SECONDS", default="300"))
+# Ventana para agrupar frames de audio de Twilio (20 ms c/u) antes de enviarlos a OpenAI. 0 o 20 = sin agrupar.
+VOICE_AUDIO_COALESCE_MS = int(get_env("VOICE_AUDIO_COALESCE_MS", default="60"))
+VOICE_AUDIO_COALESCE_MS_BY_TENANT = get_env_mapping("VOICE_AUDIO_COALESCE_MS_BY_TENANT", cast=int)
+# Timeout en segundos por herramienta de voz; se puede sobreescribir con `herramienta:segundos`.
+VOICE_TOOL_TIMEOUTS = get_env_mapping(
+    "VOICE_TOOL_TIMEOUTS",
+    default={
+        "check_availability": 10.0,
+        "create_event": 25.0,
+        "search_knowledge": 5.0,
+        "capture_lead": 5.0,
+        "escalate_support": 5.0,
+    },
+    cast=float,
+)
 
 TENANT_ID = get_env("TENANT_ID", default="default")
 TIMEZONE = get_env("TIMEZONE", default="America/Mexico_City")
 API_BASE_URL = get_env("API_BASE_URL", default="http://localhost:3000")
 FAISS_PATH = get_env("FAISS_PATH", default="faiss_index")
+# Maximo de shards FAISS (uno por tenant) residentes en memoria al mismo tiempo.
+FAISS_MAX_LOADED_SHARDS = int(get_env("FAISS_MAX_LOADED_SHARDS", default="16"))
+# Cache de embeddings por contenido: LRU en memoria + SQLite en disco ("" desactiva el disco).
+EMBEDDING_CACHE_MEMORY_SIZE = int(get_env("EMBEDDING_CACHE_MEMORY_SIZE", default="4096"))
+EMBEDDING_CACHE_PATH = get_env("EMBEDDING_CACHE_PATH", default="embedding_cache.sqlite3")
+# Maximo de mensajes entrantes procesandose a la vez (retrieval + LLM) fuera del request del webhook.
+WEBHOOK_WORKER_CONCURRENCY = int(get_env("WEBHOOK_WORKER_CONCURRENCY", default="16"))
+WEBHOOK_DRAIN_SECONDS = float(get_env("WEBHOOK_DRAIN_SECONDS", default="20"))
+# Ventana (segundos) para juntar mensajes seguidos de un usuario en un solo turno, por canal.
+# Opcional: sin configurar (o con 0) cada mensaje se responde sin esperar.
+MESSAGE_DEBOUNCE_SECONDS_BY_CHANNEL = get_env_mapping("MESSAGE_DEBOUNCE_SECONDS_BY_CHANNEL", cast=float)
+MESSAGE_DEBOUNCE_MAX_WAIT_SECONDS = float(get_env("MESSAGE_DEBOUNCE_MAX_WAIT_SECONDS", default="8"))
+# Deduplicacion de reentregas por ID de mensaje: "memory" (por proceso) o "mongo" (compartido entre workers).
+WEBHOOK_DEDUP_STORE = get_env("WEBHOOK_DEDUP_STORE", default="memory").strip().lower()
+WEBHOOK_DEDUP_TTL_SECONDS = float(get_env("WEBHOOK_DEDUP_TTL_SECONDS", default="86400"))
+WEBHOOK_DEDUP_MAX_ENTRIES = int(get_env("WEBHOOK_DEDUP_MAX_ENTRIES", default="50000"))
+# Cola de envios salientes (WhatsApp / Meta) persistida en Mongo.
+OUTBOUND_WORKERS = int(get_env("OUTBOUND_WORKERS", default="8"))
+OUTBOUND_MAX_ATTEMPTS = int(get_env("OUTBOUND_MAX_ATTEMPTS", default="6"))
+OUTBOUND_RETRY_BASE_SECONDS = float(get_env("OUTBOUND_RETRY_BASE_SECONDS", default="1"))
+OUTBOUND_RETRY_MAX_SECONDS = float(get_env("OUTBOUND_RETRY_MAX_SECONDS", default="60"))
+OUTBOUND_DRAIN_SECONDS = float(get_env("OUTBOUND_DRAIN_SECONDS", default="10"))
+OUTBOUND_RECLAIM_INTERVAL_SECONDS = float(get_env("OUTBOUND_RECLAIM_INTERVAL_SECONDS", default="1"))
+# Registros de uso de tokens: se escriben en lote en segundo plano.
+USAGE_FLUSH_BATCH_SIZE = int(get_env("USAGE_FLUSH_BATCH_SIZE", default="100"))
+USAGE_FLUSH_INTERVAL_SECONDS = float(get_env("USAGE_FLUSH_INTERVAL_SECONDS", default="2"))
+USAGE_BUFFER_MAX_RECORDS = int(get_env("USAGE_BUFFER_MAX_RECORDS", default="10000"))
+# Pool de conexiones compartido hacia graph.facebook.com / graph.instagram.com.
+GRAPH_HTTP_MAX_CONNECTIONS = int(get_env("GRAPH_HTTP_MAX_CONNECTIONS", default="100"))
+GRAPH_HTTP_MAX_CONNECTIONS_PER_HOST = int(get_env("GRAPH_HTTP_MAX_CONNECTIONS_PER_HOST", default="50"))
+GRAPH_HTTP_DNS_CACHE_SECONDS = int(get_env("GRAPH_HTTP_DNS_CACHE_SECONDS", default="300"))
+GRAPH_HTTP_KEEPALIVE_SECONDS = float(get_env("GRAPH_HTTP_KEEPALIVE_SECONDS", default="60"))
+GRAPH_HTTP_TIMEOUT_SECONDS = float(get_env("GRAPH_HTTP_TIMEOUT_SECONDS", default="20"))
 CORS_ALLOW_ORIGINS = get_env_list("CORS_ALLOW_ORIGINS", default=["*"])
 CORS_PRODUCTION_IP = get_env("CORS_PRODUCTION_IP", default="").strip()
 CORS_PRODUCTION_PORTS = get_env_list("CORS_PRODUCTION_PORTS", default=[])
@@ -65,8 +131,25 @@ MONGO_URI = get_env("MONGO_URI", "MONGODB_URI")
 MONGO_DB = get_env("MONGO_DB", "MONGODB_DATABASE")
 MONGO_KNOWLEDGE_COLLECTION = get_env("MONGO_KNOWLEDGE_COLLECTION", default="knowledge")
 MONGO_CHAT_HISTORY_COLLECTION = get_env("MONGO_CHAT_HISTORY_COLLECTION", default="chat_history")
+MONGO_CHAT_HISTORY_ARCHIVE_COLLECTION = get_env("MONGO_CHAT_HISTORY_ARCHIVE_COLLECTION", default="chat_history_archive")
+# Mensajes que se conservan en el arreglo `history` de cada conversacion; el historial completo vive en el archivo.
+CHAT_HISTORY_MAX_LIVE_MESSAGES = int(get_env("CHAT_HISTORY_MAX_LIVE_MESSAGES", default="50"))
 MONGO_LEADS_COLLECTION = get_env("MONGO_LEADS_COLLECTION", default="leads")
 MONGO_USAGE_COLLECTION = get_env("MONGO_USAGE_COLLECTION", default="usage")
+MONGO_OUTBOUND_COLLECTION = get_env("MONGO_OUTBOUND_COLLECTION", default="outbound_messages")
+MONGO_WEBHOOK_DEDUP_COLLECTION = get_env("MONGO_WEBHOOK_DEDUP_COLLECTION", default="webhook_dedup")
+# Pool de conexiones: lo comparten todas las colecciones del proceso. Hay un pool por cliente
+# (sync y async), asi que el proceso puede abrir hasta 2x MONGO_MAX_POOL_SIZE conexiones.
+MONGO_MAX_POOL_SIZE = int(get_env("MONGO_MAX_POOL_SIZE", default="100"))
+MONGO_MIN_POOL_SIZE = int(get_env("MONGO_MIN_POOL_SIZE", default="0"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(get_env("MONGO_WAIT_QUEUE_TIMEOUT_MS", default="5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(get_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", default="5000"))
+MONGO_COMPRESSORS = get_env_list("MONGO_COMPRESSORS", default=["zstd", "zlib"])
+# Vacio usa el default del servidor; p. ej. `majority` o `1`.
+MONGO_WRITE_CONCERN = get_env("MONGO_WRITE_CONCERN", default="")
+MONGO_ANALYTICS_READ_PREFERENCE = get_env("MONGO_ANALYTICS_READ_PREFERENCE", default="secondaryPreferred")
+# Crea los indices declarados en app/shared/config/indexes.py al arrancar; desactivar si se aplican como migracion.
+MONGO_ENSURE_INDEXES = get_env("MONGO_ENSURE_INDEXES", default="true").strip().lower() in ("1", "true", "yes")
 
 WHATSAPP_ACCESS_TOKEN = get_env("WHATSAPP_ACCESS_TOKEN")
 WHATSAPP_PHONE_NUMBER_ID = get_env("WHATSAPP_PHONE_NUMBER_ID")
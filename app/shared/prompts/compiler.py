@@ -0,0 +1,111 @@
+"""Compila el prompt de sistema (base + addons) en un prefijo estatico y compacto.
+
+Compilar solo cambia el formato: los encabezados decorados pasan a `## titulo` y se quitan
+espacios al final de linea y lineas en blanco repetidas. El texto de las reglas no se toca.
+El prefijo no incluye nada que cambie por turno (fecha, contexto, historial), de modo que
+es identico entre mensajes y el cache de prompts del proveedor lo puede reutilizar.
+"""
+import logging
+import re
+from typing import Dict, List, Tuple
+
+from app.shared.prompts.assistant import system_prompt as _general_system_prompt
+from app.shared.prompts.custom import custom_prompt as _custom_system_prompt
+from app.shared.prompts.customer_service import specialization_prompt as _customer_service_addon
+from app.shared.prompts.sales import specialization_prompt as _sales_addon
+from app.shared.types.prompts import CompiledPrompt, PromptSection
+from app.shared.utils.metrics import register_metrics
+from app.shared.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+BASE_ADDONS: Dict[str, str] = {
+    "custom": _custom_system_prompt,
+}
+
+SPECIALIZATION_ADDONS: Dict[str, str] = {
+    "sales": _sales_addon,
+    "customer_service": _customer_service_addon,
+}
+
+# Encabezados decorados de los addons: linea de "=", titulo, linea de "=".
+_HEADER_PATTERN = re.compile(r"^={5,}[ \t]*\n(.+?)\n={5,}[ \t]*$", re.MULTILINE)
+_TRAILING_SPACE_PATTERN = re.compile(r"[ \t]+$", re.MULTILINE)
+_BLANK_RUN_PATTERN = re.compile(r"\n{3,}")
+
+_COMPILED: Dict[Tuple[str, str, str], CompiledPrompt] = {}
+
+
+def _split_sections(source: str, text: str) -> List[Tuple[str, str, str]]:
+    """Divide un addon por sus encabezados decorados; devuelve (titulo, texto original, cuerpo)."""
+    sections = []
+    title = source
+    start = body_start = 0
+    for match in _HEADER_PATTERN.finditer(text):
+        sections.append((title, text[start:match.start()], text[body_start:match.start()]))
+        title = match.group(1).strip()
+        start, body_start = match.start(), match.end()
+    sections.append((title, text[start:], text[body_start:]))
+    return [section for section in sections if section[2].strip()]
+
+
+def _prompt_parts(base: str, profile: str) -> List[Tuple[str, str]]:
+    """Textos que forman el prompt de sistema, en orden, como (origen, texto)."""
+    parts = [("system", _general_system_prompt)]
+    if BASE_ADDONS.get(base):
+        parts.append((base, BASE_ADDONS[base]))
+    if SPECIALIZATION_ADDONS.get(profile):
+        parts.append((profile, SPECIALIZATION_ADDONS[profile]))
+    return parts
+
+
+def compile_system_prompt(base: str, profile: str, timezone: str) -> CompiledPrompt:
+    cache_key = (base, profile or "", timezone)
+    compiled = _COMPILED.get(cache_key)
+    if compiled is not None:
+        return compiled
+
+    parts = _prompt_parts(base, profile)
+    sections: List[PromptSection] = []
+    rendered: List[str] = []
+    for source, text in parts:
+        for title, raw, body in _split_sections(source, text):
+            compact = _TRAILING_SPACE_PATTERN.sub("", body.replace("{timezone}", timezone)).strip("\n")
+            if title != source:
+                compact = f"## {title}\n{compact}"
+            compact = _BLANK_RUN_PATTERN.sub("\n\n", compact).strip()
+            sections.append(PromptSection(source, title, count_tokens(raw), count_tokens(compact)))
+            rendered.append(compact)
+
+    raw_system = "\n".join(text for _, text in parts).replace("{timezone}", timezone)
+    static = "\n\n".join(rendered)
+    compiled = CompiledPrompt(
+        base=base,
+        profile=profile or "",
+        static=static,
+        raw_tokens=count_tokens(raw_system),
+        tokens=count_tokens(static),
+        sections=sections,
+    )
+    _COMPILED[cache_key] = compiled
+    logger.info(
+        "System prompt compiled base=%s profile=%s tokens=%s raw_tokens=%s",
+        base,
+        profile or "-",
+        compiled.tokens,
+        compiled.raw_tokens,
+    )
+    return compiled
+
+
+def prompt_stats() -> Dict[str, Dict[str, int]]:
+    return {
+        f"{compiled.base}:{compiled.profile or '-'}": {
+            "tokens": compiled.tokens,
+            "raw_tokens": compiled.raw_tokens,
+        }
+        for compiled in _COMPILED.values()
+    }
+
+
+register_metrics("system_prompts", prompt_stats)
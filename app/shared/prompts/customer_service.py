@@ -1,6 +1,6 @@
 # Addon de especializacion: Atencion al Cliente.
 # Este prompt se combina ENCIMA del prompt base (general o custom).
-# No repite reglas de acciones JSON; esas viven en el prompt base.
+# No repite reglas de herramientas (agenda, leads, soporte); esas viven en el prompt base.
 
 specialization_prompt = """
 Especializacion adicional — Atencion al Cliente:
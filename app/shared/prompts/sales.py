@@ -18,7 +18,7 @@ Esta skill NO define:
 - CRM.
 - Handoff operativo.
 - Formatos finales de escalamiento.
-- Acciones JSON.
+- Herramientas del agente (agenda, leads, escalamiento).
 - Reglas técnicas del sistema.
 
 Todo eso debe vivir en el prompt base, en reglas del cliente o en otros archivos especializados.
@@ -2,6 +2,7 @@ from fastapi import APIRouter
 
 from app.app.registry.modules import REGISTERED_MODULES
 from app.shared.config.settings import APP_NAME
+from app.shared.utils.metrics import collect_metrics
 
 router = APIRouter()
 
@@ -26,6 +27,7 @@ async def root():
             "/api/meta/webhook",
             "/api/twilio/voice",
             "/health",
+            "/metrics",
         ],
     }
 
@@ -33,3 +35,8 @@ async def root():
 @router.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@router.get("/metrics")
+async def metrics():
+    return collect_metrics()
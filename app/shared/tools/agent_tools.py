@@ -0,0 +1,80 @@
+"""Esquema unico de herramientas del asistente, compartido por voz (Realtime) y texto (function calling)."""
+from typing import Any, Dict, List
+
+TOOL_DEFINITIONS = [
+    {
+        "name": "check_availability",
+        "description": "Consulta los horarios disponibles para agendar una cita.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "preferred_date": {
+                    "type": "string",
+                    "description": "Fecha preferida en formato YYYY-MM-DD.",
+                }
+            },
+            "required": [],
+        },
+    },
+    {
+        "name": "create_event",
+        "description": "Crea una cita cuando ya tienes fecha, hora y correo confirmados.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "date": {"type": "string", "description": "Fecha de la cita en formato YYYY-MM-DD."},
+                "startTime": {
+                    "type": "string",
+                    "description": "Inicio en ISO 8601 con la zona horaria del negocio, p. ej. 2026-05-10T10:00-06:00.",
+                },
+                "title": {"type": "string"},
+                "guestEmails": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["date", "startTime", "title", "guestEmails"],
+        },
+    },
+    {
+        "name": "capture_lead",
+        "description": "Guarda datos de un lead cuando el usuario muestra intencion de compra.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "email": {"type": "string"},
+                "phone": {"type": "string"},
+                "intent_level": {"type": "string", "enum": ["medium", "high"]},
+                "aditional_info": {"type": "string"},
+            },
+            "required": ["intent_level"],
+        },
+    },
+    {
+        "name": "search_knowledge",
+        "description": "Busca informacion en la base de conocimiento de la empresa.",
+        "parameters": {
+            "type": "object",
+            "properties": {"query": {"type": "string"}},
+            "required": ["query"],
+        },
+    },
+    {
+        "name": "escalate_support",
+        "description": "Escala la conversacion a un agente humano cuando el usuario lo solicita.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_phone": {"type": "string"},
+                "reason": {"type": "string"},
+            },
+            "required": ["user_phone", "reason"],
+        },
+    },
+]
+
+
+def realtime_tool_schemas() -> List[Dict[str, Any]]:
+    return [{"type": "function", **definition} for definition in TOOL_DEFINITIONS]
+
+
+def chat_tool_schemas() -> List[Dict[str, Any]]:
+    return [{"type": "function", "function": definition} for definition in TOOL_DEFINITIONS]
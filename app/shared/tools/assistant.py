@@ -1,29 +1,31 @@
 import asyncio
 import json
 import logging
-import re
 from datetime import datetime
 
-from langchain.prompts import PromptTemplate
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
 from langchain_openai import ChatOpenAI
 from langdetect import detect
 
 from app.modules.whatsapp.tools.service import whatsapp_service
 from app.shared.config.settings import AGENT_BASE, AGENT_PROFILE, OPENAI_API_KEY, OPENAI_MODEL, SUPPORT_PHONE, TENANT_ID, TIMEZONE
-from app.shared.prompts.assistant import context_prompt
-from app.shared.prompts.assistant import system_prompt as _general_system_prompt
-from app.shared.prompts.customer_service import specialization_prompt as _customer_service_addon
-from app.shared.prompts.custom import custom_prompt as _custom_system_prompt
-from app.shared.prompts.sales import specialization_prompt as _sales_addon
+from app.shared.prompts.assistant import turn_prompt
+from app.shared.prompts.compiler import compile_system_prompt
+from app.shared.tools.agent_tools import chat_tool_schemas
 from app.shared.tools.availability import (
-    check_slot_availability,
+    acheck_slot_availability,
+    aget_availability_suggestions,
     format_availability_suggestions,
-    get_availability_suggestions,
 )
-from app.shared.tools.calendar import call_google_calendar
-from app.shared.tools.leads import create_lead
-from app.shared.tools.retrieval import search_semantic
-from app.shared.tools.usage_tracker import save_token_usage
+from app.shared.tools.calendar import acall_google_calendar
+from app.shared.tools.context_builder import build_turn_context
+from app.shared.tools.leads import acreate_lead
+from app.shared.tools.outbound_messages import enqueue_outbound_message
+from app.shared.tools.retrieval import aretrieve, asearch_semantic
+from app.shared.tools.usage_tracker import asave_token_usage
+from app.shared.types.retrieval import RetrievalResult
+from app.shared.utils.documents import join_page_contents
+from app.shared.utils.tokens import count_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -32,40 +34,13 @@ llm = ChatOpenAI(
     model=OPENAI_MODEL,
     temperature=0.2,
 )
+llm_with_tools = llm.bind_tools(chat_tool_schemas())
 
-_PROMPT_TEMPLATE_CACHE: dict[str, PromptTemplate] = {}
+# Rondas maximas modelo -> herramientas -> modelo dentro de un turno.
+MAX_TOOL_STEPS = 4
 
-_OPTIONAL_BASE_ADDONS = {
-    "custom": _custom_system_prompt,
-}
-
-_SPECIALIZATION_ADDONS: dict[str, str] = {
-    "sales": _sales_addon,
-    "customer_service": _customer_service_addon,
-}
-
-
-def _get_prompt(base: str, profile: str) -> PromptTemplate:
-    cache_key = f"{base}:{profile}"
-    if cache_key not in _PROMPT_TEMPLATE_CACHE:
-        base_system = _general_system_prompt
-
-        base_addon = _OPTIONAL_BASE_ADDONS.get(base, "")
-
-        specialization_addon = _SPECIALIZATION_ADDONS.get(profile, "")
-        
-        full_system = (
-            base_system
-            + ("\n" + base_addon if base_addon else "")
-            + ("\n" + specialization_addon if specialization_addon else "")
-        )
-        
-        template = "Fecha y hora actual: {current_date}\n\n" + full_system + "\n" + context_prompt
-        _PROMPT_TEMPLATE_CACHE[cache_key] = PromptTemplate(
-            input_variables=["context", "query", "language", "tenant_id", "timezone", "current_date"],
-            template=template,
-        )
-    return _PROMPT_TEMPLATE_CACHE[cache_key]
+# Sin esta opcion OpenAI no manda el chunk final con el uso de tokens en streaming.
+STREAM_OPTIONS = {"include_usage": True}
 
 
 def detect_language(text):
@@ -78,6 +53,14 @@ def detect_language(text):
 def _extract_token_usage(response):
     usage_metadata = response.response_metadata if hasattr(response, "response_metadata") else {}
     token_usage = usage_metadata.get("token_usage", {})
+    streamed_usage = getattr(response, "usage_metadata", None)
+    if not token_usage and streamed_usage:
+        # Las respuestas en streaming traen el uso en `usage_metadata`.
+        return (
+            streamed_usage.get("input_tokens", 0),
+            streamed_usage.get("output_tokens", 0),
+            streamed_usage.get("total_tokens", 0),
+        )
     return (
         token_usage.get("prompt_tokens", 0),
         token_usage.get("completion_tokens", 0),
@@ -85,7 +68,12 @@ def _extract_token_usage(response):
     )
 
 
-def _dispatch_support_notification(tenant_id: str, conversation_id: str, user_phone: str, reason: str):
+SUPPORT_ESCALATED = "He solicitado el escalamiento a soporte. Un agente te contactara por WhatsApp pronto."
+SUPPORT_UNAVAILABLE = "No pude escalar a soporte en este momento. Intenta de nuevo en unos minutos."
+
+
+def _support_notification(tenant_id: str, conversation_id: str, user_phone: str, reason: str):
+    """Envio para soporte como (plataforma, destino, mensaje), o el texto para el usuario si falta un dato."""
     if not SUPPORT_PHONE:
         logger.error("SUPPORT_PHONE is not configured")
         return "Se intento escalar a soporte, pero no esta configurado el numero de soporte."
@@ -100,31 +88,46 @@ def _dispatch_support_notification(tenant_id: str, conversation_id: str, user_ph
         f"Usuario: {user_formatted}\n"
         f"Motivo: {reason}\n"
     )
+    return "whatsapp", support_formatted, message_to_support
 
-    try:
-        loop = asyncio.get_running_loop()
-        loop.create_task(whatsapp_service.send_text_message(support_formatted, message_to_support))
-    except RuntimeError:
-        asyncio.run(whatsapp_service.send_text_message(support_formatted, message_to_support))
 
-    return "He solicitado el escalamiento a soporte. Un agente te contactara por WhatsApp pronto."
+async def _adispatch_support_notification(tenant_id: str, conversation_id: str, user_phone: str, reason: str):
+    notification = _support_notification(tenant_id, conversation_id, user_phone, reason)
+    if isinstance(notification, str):
+        return notification
+
+    try:
+        await enqueue_outbound_message(*notification)
+    except Exception as exc:
+        logger.error("Could not enqueue support notification conversation=%s: %s", conversation_id, str(exc))
+        return SUPPORT_UNAVAILABLE
+    return SUPPORT_ESCALATED
 
 
-def _handle_action(action_json: dict, question: str, tenant_id: str, conversation_id: str):
+async def _ahandle_action(action_json: dict, question: str, tenant_id: str, conversation_id: str):
     action = action_json.get("action")
 
+    if action == "capture_lead":
+        if action_json.get("name") or action_json.get("email") or action_json.get("phone"):
+            await acreate_lead(action_json)
+            return "Datos del cliente guardados."
+        return "Faltan nombre, correo o telefono para guardar los datos del cliente."
+
+    if action == "search_knowledge":
+        documents = await asearch_semantic(action_json.get("query") or question, tenant_id)
+        if documents:
+            return f"Informacion encontrada:\n{join_page_contents(documents)}"
+        return "No encontre informacion relevante sobre ese tema en la base de conocimiento."
+
     if action == "check_availability":
-        preferred_date = action_json.get("preferred_date")
-        availability_data = get_availability_suggestions(preferred_date=preferred_date, tenant_id=tenant_id)
+        availability_data = await aget_availability_suggestions(
+            preferred_date=action_json.get("preferred_date"),
+            tenant_id=tenant_id,
+        )
         if availability_data:
             return format_availability_suggestions(availability_data)
         return "No pude consultar los horarios disponibles en este momento."
 
-    if action == "capture_lead":
-        if action_json.get("name") or action_json.get("email") or action_json.get("phone"):
-            create_lead(action_json)
-        return action_json.get("response", "")
-
     if action == "create_event":
         event_date = action_json.get("date")
         start_time_iso = action_json.get("startTime", "")
@@ -132,7 +135,7 @@ def _handle_action(action_json: dict, question: str, tenant_id: str, conversatio
         if event_date and start_time_iso:
             try:
                 event_dt = datetime.fromisoformat(start_time_iso.replace("Z", "+00:00"))
-                slot_available = check_slot_availability(
+                slot_available = await acheck_slot_availability(
                     event_date,
                     event_dt.strftime("%H:%M"),
                     tenant_id=tenant_id,
@@ -141,12 +144,11 @@ def _handle_action(action_json: dict, question: str, tenant_id: str, conversatio
                 logger.error("Error verifying create_event slot: %s", str(exc))
 
         if slot_available:
-            result = call_google_calendar(action_json)
-            create_lead(action_json)
+            result, _ = await asyncio.gather(acall_google_calendar(action_json), acreate_lead(action_json))
             if result["status"] == "success":
                 return "Tu cita ya quedo registrada."
             if result["status"] == "conflict":
-                availability_data = get_availability_suggestions(
+                availability_data = await aget_availability_suggestions(
                     preferred_date=event_date,
                     tenant_id=tenant_id,
                 )
@@ -158,7 +160,7 @@ def _handle_action(action_json: dict, question: str, tenant_id: str, conversatio
                 return "El horario que propusiste no esta disponible."
             return f"Error al crear la cita: {result.get('message', 'Error desconocido')}"
 
-        availability_data = get_availability_suggestions(preferred_date=event_date, tenant_id=tenant_id)
+        availability_data = await aget_availability_suggestions(preferred_date=event_date, tenant_id=tenant_id)
         if availability_data:
             return (
                 "El horario que propusiste no esta disponible. "
@@ -173,12 +175,105 @@ def _handle_action(action_json: dict, question: str, tenant_id: str, conversatio
             or action_json.get("phone_number")
         )
         reason = action_json.get("reason") or action_json.get("summary") or question
-        return _dispatch_support_notification(tenant_id, conversation_id, user_phone, reason)
+        return await _adispatch_support_notification(tenant_id, conversation_id, user_phone, reason)
 
     return None
 
 
-def generate_answer(
+def _build_messages(question: str, history, chunks: list, tenant_id: str, profile: str):
+    """Mensajes del turno y su estimado de tokens de prompt (sin contar las herramientas)."""
+    turn_context = build_turn_context(history, chunks, tenant_id)
+    full_context = turn_context.history + "\n" if turn_context.history else ""
+    if turn_context.context:
+        full_context += f"\nContexto de la empresa:\n{turn_context.context}"
+
+    system = compile_system_prompt(AGENT_BASE, profile, TIMEZONE)
+    turn = turn_prompt.format(
+        context=full_context,
+        query=question,
+        language=question,
+        current_date=datetime.now().strftime("%Y-%m-%d (%A)"),
+    )
+    return [SystemMessage(content=system.static), HumanMessage(content=turn)], system.tokens + count_tokens(turn)
+
+
+def _usage_record(
+    usage,
+    usage_estimated: bool,
+    estimated_prompt_tokens: int,
+    question: str,
+    response_text: str,
+    tenant_id: str,
+    conversation_id: str,
+    source: str,
+):
+    prompt_tokens, completion_tokens, total_tokens = usage
+    return {
+        "tenant_id": tenant_id,
+        "conversation_id": conversation_id,
+        "model": OPENAI_MODEL,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": total_tokens,
+        "estimated_prompt_tokens": estimated_prompt_tokens,
+        "usage_estimated": usage_estimated,
+        "question": question,
+        "answer": response_text[:500],
+        "source": source,
+    }
+
+
+def _completion_tokens(response) -> int:
+    arguments = (json.dumps(tool_call.get("args", {}), ensure_ascii=False) for tool_call in response.tool_calls)
+    return count_tokens(response.content or "") + sum(count_tokens(text) for text in arguments)
+
+
+def _step_usage(response, estimated_prompt_tokens: int):
+    """Uso de una llamada al modelo; si el proveedor no lo reporta se estima con tiktoken."""
+    usage = _extract_token_usage(response)
+    if any(usage):
+        return usage, False
+    completion_tokens = _completion_tokens(response)
+    return (estimated_prompt_tokens, completion_tokens, estimated_prompt_tokens + completion_tokens), True
+
+
+def _add_usage(usage, step_usage):
+    return tuple(total + step for total, step in zip(usage, step_usage))
+
+
+def _appended_tokens(response, tool_messages: list) -> int:
+    """Tokens que la siguiente ronda suma al prompt: la llamada del modelo y los resultados."""
+    return _completion_tokens(response) + sum(count_tokens(message.content) for message in tool_messages)
+
+
+def _tool_action(tool_call: dict, tenant_id: str) -> dict:
+    return {**tool_call.get("args", {}), "action": tool_call["name"], "tenantId": tenant_id}
+
+
+def _tool_message(tool_call: dict, result) -> ToolMessage:
+    return ToolMessage(content=result or "No pude ejecutar esa accion.", tool_call_id=tool_call["id"])
+
+
+def _log_turn(conversation_id: str, steps: int, tools_used: list, estimated_prompt_tokens: int, response_text: str):
+    logger.info(
+        "Assistant turn conversation=%s steps=%s tools=%s estimated_prompt_tokens=%s answer=%s",
+        conversation_id,
+        steps,
+        ",".join(tools_used) or "-",
+        estimated_prompt_tokens,
+        response_text[:200],
+    )
+
+
+async def _aresolve_chunks(question: str, context: str, tenant_id: str, retrieval: RetrievalResult):
+    if context:
+        return [context]
+    if retrieval is None:
+        retrieval = await aretrieve(question, tenant_id)
+    return retrieval.chunks
+
+
+async def agenerate_answer(
     question: str,
     history=None,
     context: str = "",
@@ -186,63 +281,103 @@ def generate_answer(
     conversation_id: str = None,
     source: str = "web",
     profile: str = None,
+    retrieval: RetrievalResult = None,
 ):
-    tenant_id = tenant_id or TENANT_ID
-    base = AGENT_BASE
-    profile = profile or AGENT_PROFILE
+    response_text = ""
+    async for delta in astream_answer(
+        question,
+        history=history,
+        context=context,
+        tenant_id=tenant_id,
+        conversation_id=conversation_id,
+        source=source,
+        profile=profile,
+        retrieval=retrieval,
+        stream=False,
+    ):
+        response_text = delta
+    return response_text
 
-    if not context:
-        documents = search_semantic(question, tenant_id)
-        if documents:
-            context = "\n".join(document.page_content for document in documents)
 
-    history_text = ""
-    if history:
-        for message in history:
-            prefix = "Usuario:" if message["role"] == "user" else "Asistente:"
-            history_text += f"{prefix} {message['content']}\n"
+async def _arun_tool_calls(tool_calls: list, question: str, tenant_id: str, conversation_id: str):
+    results = await asyncio.gather(
+        *(
+            _ahandle_action(_tool_action(tool_call, tenant_id), question, tenant_id, conversation_id)
+            for tool_call in tool_calls
+        )
+    )
+    return [_tool_message(tool_call, result) for tool_call, result in zip(tool_calls, results)]
 
-    full_context = history_text
-    if context:
-        full_context += f"\nContexto de la empresa:\n{context}"
 
-    chain_input = {
-        "context": full_context,
-        "query": question,
-        "language": question,
-        "tenant_id": tenant_id,
-        "timezone": TIMEZONE,
-        "current_date": datetime.now().strftime("%Y-%m-%d (%A)"),
-    }
-    response = llm.invoke(_get_prompt(base, profile).format(**chain_input))
-    response_text = response.content
+async def astream_answer(
+    question: str,
+    history=None,
+    context: str = "",
+    tenant_id: str = None,
+    conversation_id: str = None,
+    source: str = "web",
+    profile: str = None,
+    retrieval: RetrievalResult = None,
+    stream: bool = True,
+):
+    """Turno del asistente con function calling; entrega el texto por partes conforme llega.
 
-    prompt_tokens, completion_tokens, total_tokens = _extract_token_usage(response)
+    Las herramientas que pida el modelo se ejecutan y sus resultados vuelven al modelo en
+    el mismo turno. Con `stream=False` solo se entrega la respuesta final completa.
+    """
+    tenant_id = tenant_id or TENANT_ID
+    profile = profile or AGENT_PROFILE
+    chunks = await _aresolve_chunks(question, context, tenant_id, retrieval)
+
+    messages, estimated_prompt_tokens = _build_messages(question, history, chunks, tenant_id, profile)
+    step_prompt_tokens = estimated_prompt_tokens
+    usage = (0, 0, 0)
+    usage_estimated = False
+    tools_used = []
+    response_text = ""
+    answered = False
+    for step in range(1, MAX_TOOL_STEPS + 1):
+        if stream:
+            response = None
+            async for chunk in llm_with_tools.astream(messages, stream_options=STREAM_OPTIONS):
+                response = chunk if response is None else response + chunk
+                if chunk.content:
+                    yield chunk.content
+        else:
+            response = await llm_with_tools.ainvoke(messages)
+        if response is None:
+            break
+
+        step_usage, step_estimated = _step_usage(response, step_prompt_tokens)
+        usage = _add_usage(usage, step_usage)
+        usage_estimated = usage_estimated or step_estimated
+        response_text = response.content or response_text
+        if not response.tool_calls:
+            answered = True
+            break
+
+        messages.append(response)
+        tool_messages = await _arun_tool_calls(response.tool_calls, question, tenant_id, conversation_id)
+        tools_used.extend(tool_call["name"] for tool_call in response.tool_calls)
+        messages.extend(tool_messages)
+        step_prompt_tokens += _appended_tokens(response, tool_messages)
+        response_text = tool_messages[-1].content
+        if stream and response.content:
+            yield "\n\n"
+
+    _log_turn(conversation_id, step, tools_used, estimated_prompt_tokens, response_text)
     if conversation_id:
-        save_token_usage(
-            tenant_id=tenant_id,
-            conversation_id=conversation_id,
-            model=OPENAI_MODEL,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
-            total_tokens=total_tokens,
-            question=question,
-            answer=response_text[:500],
-            source=source,
+        record = _usage_record(
+            usage,
+            usage_estimated,
+            estimated_prompt_tokens,
+            question,
+            response_text,
+            tenant_id,
+            conversation_id,
+            source,
         )
-
-    cleaned = re.sub(r"^```json\n|\n```$", "", response_text.strip(), flags=re.MULTILINE)
-    logger.info("Generated response: %s", response_text)
-    logger.info("Cleaned response for JSON parsing: %s", cleaned)
-    try:
-        parsed = json.loads(cleaned)
-        action_json = parsed if isinstance(parsed, dict) else {}
-    except json.JSONDecodeError:
-        action_json = {}
-    logger.info("Parsed action JSON: %s", action_json)
-    if "action" in action_json:
-        action_response = _handle_action(action_json, question, tenant_id, conversation_id)
-        if action_response is not None:
-            return action_response
-
-    return response_text
+        await asave_token_usage(**record)
+    if not stream or not answered:
+        # Sin texto final del modelo (limite de rondas) se entrega el ultimo resultado de herramienta.
+        yield response_text
@@ -1,5 +1,9 @@
 import audioop
 import base64
+from typing import Optional
+
+# mu-law a 8 kHz: un byte por muestra.
+MULAW_BYTES_PER_MS = 8
 
 
 def decode_mulaw(base64_audio: str) -> bytes:
@@ -10,3 +14,37 @@ def decode_mulaw(base64_audio: str) -> bytes:
 def encode_mulaw(pcm_audio: bytes) -> str:
     mulaw = audioop.lin2ulaw(pcm_audio, 2)
     return base64.b64encode(mulaw).decode()
+
+
+class AudioFrameCoalescer:
+    """Agrupa payloads mu-law en base64 hasta juntar `window_ms` de audio."""
+
+    def __init__(self, window_ms: int = 0):
+        self.window_ms = window_ms
+        self._window_bytes = window_ms * MULAW_BYTES_PER_MS
+        self._chunks = []
+        self._buffered_bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_ms > 20
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._chunks)
+
+    def add(self, base64_audio: str) -> Optional[str]:
+        chunk = base64.b64decode(base64_audio)
+        self._chunks.append(chunk)
+        self._buffered_bytes += len(chunk)
+        if self._buffered_bytes >= self._window_bytes:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[str]:
+        if not self._chunks:
+            return None
+        audio = b"".join(self._chunks)
+        self._chunks = []
+        self._buffered_bytes = 0
+        return base64.b64encode(audio).decode()
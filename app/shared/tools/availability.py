@@ -2,10 +2,12 @@ import json
 import logging
 from datetime import datetime
 
+import aiohttp
 import requests
 
 from app.shared.config.settings import API_BASE_URL, TENANT_ID
 from app.shared.constants.months import MONTHS_ES
+from app.shared.tools.http_clients import get_api_session
 
 logger = logging.getLogger(__name__)
 
@@ -90,15 +92,19 @@ def _build_slot_label(slot, fallback_day_of_week="", fallback_date=None):
     return start_time or "Horario no disponible"
 
 
+def _availability_request(preferred_date=None, days_ahead=7, max_slots=50):
+    if preferred_date:
+        return "/api/calendar/availability/date", {"date": preferred_date}
+    return "/api/calendar/availability/suggestions", {
+        "daysAhead": days_ahead,
+        "maxSlots": max_slots,
+        "fromDate": datetime.now().strftime("%Y-%m-%d"),
+    }
+
+
 def get_availability_suggestions(preferred_date=None, days_ahead=7, max_slots=50, tenant_id=None):
     try:
-        if preferred_date:
-            endpoint = "/api/calendar/availability/date"
-            params = {"date": preferred_date}
-        else:
-            endpoint = "/api/calendar/availability/suggestions"
-            params = {"daysAhead": days_ahead, "maxSlots": max_slots, "fromDate": datetime.now().strftime("%Y-%m-%d")}
-
+        endpoint, params = _availability_request(preferred_date, days_ahead, max_slots)
         response = requests.get(
             f"{API_BASE_URL}{endpoint}",
             params=params,
@@ -117,6 +123,27 @@ def get_availability_suggestions(preferred_date=None, days_ahead=7, max_slots=50
         return None
 
 
+async def aget_availability_suggestions(preferred_date=None, days_ahead=7, max_slots=50, tenant_id=None):
+    try:
+        endpoint, params = _availability_request(preferred_date, days_ahead, max_slots)
+        async with get_api_session().get(
+            f"{API_BASE_URL}{endpoint}",
+            params=params,
+            headers=_availability_headers(tenant_id),
+            timeout=aiohttp.ClientTimeout(total=10),
+        ) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+        logger.info("Availability response: %s", json.dumps(data))
+        return data
+    except aiohttp.ClientError as exc:
+        logger.error("Error getting availability: %s", str(exc))
+        return None
+    except Exception as exc:
+        logger.error("Unexpected availability error: %s", str(exc))
+        return None
+
+
 def get_next_available_slot(from_date=None, max_days_ahead=30, tenant_id=None):
     try:
         params = {"maxDaysAhead": max_days_ahead, "fromDate": from_date or datetime.now().strftime("%Y-%m-%d")}
@@ -210,13 +237,7 @@ def format_availability_suggestions(availability_data, max_suggestions=3):
     )
 
 
-def check_slot_availability(date, start_time, tenant_id=None):
-    availability_data = get_availability_suggestions(
-        preferred_date=date,
-        days_ahead=1,
-        max_slots=50,
-        tenant_id=tenant_id,
-    )
+def _slot_in_availability(availability_data, date, start_time):
     if not availability_data or not availability_data.get("success"):
         return False
 
@@ -234,6 +255,26 @@ def check_slot_availability(date, start_time, tenant_id=None):
     return False
 
 
+def check_slot_availability(date, start_time, tenant_id=None):
+    availability_data = get_availability_suggestions(
+        preferred_date=date,
+        days_ahead=1,
+        max_slots=50,
+        tenant_id=tenant_id,
+    )
+    return _slot_in_availability(availability_data, date, start_time)
+
+
+async def acheck_slot_availability(date, start_time, tenant_id=None):
+    availability_data = await aget_availability_suggestions(
+        preferred_date=date,
+        days_ahead=1,
+        max_slots=50,
+        tenant_id=tenant_id,
+    )
+    return _slot_in_availability(availability_data, date, start_time)
+
+
 def check_exact_slot_availability(start_datetime, duration=60, tenant_id=None):
     if not start_datetime:
         return False
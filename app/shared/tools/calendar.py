@@ -1,8 +1,11 @@
+import asyncio
 import json
 
+import aiohttp
 import requests
 
 from app.shared.config.settings import API_BASE_URL
+from app.shared.tools.http_clients import get_api_session
 
 
 def _safe_json_response(response):
@@ -41,8 +44,7 @@ def _extract_suggestions(response_data):
     return []
 
 
-def call_google_calendar(route_or_event_data, event_data: dict = None, token: str = None):
-    del token
+def _appointment_request(route_or_event_data, event_data: dict = None):
     if isinstance(route_or_event_data, dict) and event_data is None:
         payload_source = route_or_event_data
     else:
@@ -62,23 +64,17 @@ def call_google_calendar(route_or_event_data, event_data: dict = None, token: st
         "Content-Type": "application/json",
         "tenant_id": payload_source.get("tenantId"),
     }
+    return payload, headers
 
-    try:
-        response = requests.post(
-            f"{API_BASE_URL}/api/calendar/appointments",
-            json=payload,
-            headers=headers,
-            timeout=15,
-        )
-    except requests.RequestException as exc:
-        return {"status": "error", "message": f"No se pudo crear la cita: {str(exc)}"}
 
-    response_data = _safe_json_response(response)
+def _appointment_result(status_code: int, response_data):
+    if not isinstance(response_data, dict):
+        response_data = {}
     response_payload = response_data.get("data", {}) if isinstance(response_data.get("data"), dict) else {}
     response_message = response_data.get("message") or response_data.get("error")
     suggestions = _extract_suggestions(response_data)
 
-    if response.status_code in (200, 201) and response_data.get("success") is True:
+    if status_code in (200, 201) and response_data.get("success") is True:
         return {
             "status": "success",
             "message": response_data.get("message", "Appointment created successfully"),
@@ -93,7 +89,7 @@ def call_google_calendar(route_or_event_data, event_data: dict = None, token: st
             "suggestions": suggestions,
         }
 
-    if response.status_code == 409:
+    if status_code == 409:
         return {
             "status": "limit_reached",
             "message": response_message or "Ya registraste una cita hoy desde esta conexion.",
@@ -101,5 +97,42 @@ def call_google_calendar(route_or_event_data, event_data: dict = None, token: st
 
     return {
         "status": "error",
-        "message": response_message or f"No se pudo crear la cita. Codigo HTTP: {response.status_code}",
+        "message": response_message or f"No se pudo crear la cita. Codigo HTTP: {status_code}",
     }
+
+
+def call_google_calendar(route_or_event_data, event_data: dict = None, token: str = None):
+    del token
+    payload, headers = _appointment_request(route_or_event_data, event_data)
+
+    try:
+        response = requests.post(
+            f"{API_BASE_URL}/api/calendar/appointments",
+            json=payload,
+            headers=headers,
+            timeout=15,
+        )
+    except requests.RequestException as exc:
+        return {"status": "error", "message": f"No se pudo crear la cita: {str(exc)}"}
+
+    return _appointment_result(response.status_code, _safe_json_response(response))
+
+
+async def acall_google_calendar(route_or_event_data, event_data: dict = None, token: str = None):
+    del token
+    payload, headers = _appointment_request(route_or_event_data, event_data)
+
+    try:
+        async with get_api_session().post(
+            f"{API_BASE_URL}/api/calendar/appointments",
+            json=payload,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=15),
+        ) as response:
+            try:
+                response_data = await response.json(content_type=None)
+            except ValueError:
+                response_data = {}
+            return _appointment_result(response.status, response_data)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+        return {"status": "error", "message": f"No se pudo crear la cita: {str(exc)}"}
@@ -1,24 +1,53 @@
-from app.shared.tools.assistant import generate_answer
-from app.shared.tools.chat_history import get_conversation_history, save_message
-from app.shared.tools.retrieval import search_semantic
-from app.shared.utils.documents import join_page_contents
+from app.shared.tools.assistant import agenerate_answer, astream_answer
+from app.shared.tools.chat_history import aload_conversation_state, asave_conversation_state
+from app.shared.tools.retrieval import aretrieve
+from app.shared.types.conversation import ConversationState
 
 
-def process_text_message(message_text: str, tenant_id: str, conversation_id: str, source: str):
-    history = get_conversation_history(tenant_id, conversation_id)
-    save_message(tenant_id, conversation_id, "user", message_text)
+async def aprocess_text_message(
+    message_text: str,
+    tenant_id: str,
+    conversation_id: str,
+    source: str,
+    state: ConversationState = None,
+):
+    state = state or await aload_conversation_state(tenant_id, conversation_id)
+    state.add_message("user", message_text)
+    try:
+        retrieval = await aretrieve(message_text, tenant_id)
 
-    documents = search_semantic(message_text, tenant_id)
-    context = join_page_contents(documents)
+        answer = await agenerate_answer(
+            message_text,
+            history=state.history,
+            tenant_id=tenant_id,
+            conversation_id=conversation_id,
+            source=source,
+            retrieval=retrieval,
+        )
+        state.add_message("assistant", answer)
+    finally:
+        # Una sola escritura por turno; si el LLM falla igual queda guardado el mensaje del usuario.
+        await asave_conversation_state(state)
+    return answer
 
-    answer = generate_answer(
-        message_text,
-        history=history,
-        context=context,
-        tenant_id=tenant_id,
-        conversation_id=conversation_id,
-        source=source,
-    )
 
-    save_message(tenant_id, conversation_id, "assistant", answer)
-    return answer
+async def astream_text_message(message_text: str, tenant_id: str, conversation_id: str, source: str):
+    state = await aload_conversation_state(tenant_id, conversation_id)
+    state.add_message("user", message_text)
+    try:
+        retrieval = await aretrieve(message_text, tenant_id)
+
+        answer = ""
+        async for delta in astream_answer(
+            message_text,
+            history=state.history,
+            tenant_id=tenant_id,
+            conversation_id=conversation_id,
+            source=source,
+            retrieval=retrieval,
+        ):
+            answer += delta
+            yield delta
+        state.add_message("assistant", answer)
+    finally:
+        await asave_conversation_state(state)
@@ -1,37 +1,164 @@
+import asyncio
 from collections import deque
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
+from app.shared.config.database import async_chat_history_archive_collection as async_archive_collection
+from app.shared.config.database import async_chat_history_collection as async_collection
+from app.shared.config.database import chat_history_archive_collection as archive_collection
 from app.shared.config.database import chat_history_collection as collection
+from app.shared.config.settings import CHAT_HISTORY_MAX_LIVE_MESSAGES
+from app.shared.types.conversation import ConversationState
 
 MAX_HISTORY = 10
 
+# Solo los ultimos MAX_HISTORY mensajes; el resto del documento se lee completo.
+HISTORY_PROJECTION = {"history": {"$slice": -MAX_HISTORY}}
+# Para leer datos de la conversacion sin traer el historial.
+WITHOUT_HISTORY_PROJECTION = {"history": 0}
+# Todo lo que necesita un turno entrante en una sola lectura.
+STATE_PROJECTION = {"support_active": 1, "name": 1, "history": {"$slice": -MAX_HISTORY}}
+
+
+def _conversation_filter(tenant_id: str, conversation_id: str) -> Dict[str, Any]:
+    return {"tenantId": tenant_id, "conversation_id": conversation_id}
+
+
+def _history_from_document(document: Optional[Dict[str, Any]]):
+    if document and "history" in document:
+        return deque(document["history"], maxlen=MAX_HISTORY)
+    return deque(maxlen=MAX_HISTORY)
+
+
+def _history_entry(role: str, content: str) -> Dict[str, Any]:
+    return {"role": role, "content": content, "hour": datetime.utcnow()}
+
+
+def _archive_entry(tenant_id: str, conversation_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {"tenantId": tenant_id, "conversation_id": conversation_id, **entry}
+
+
+def _history_archived_condition() -> Dict[str, Any]:
+    # El arreglo solo se recorta si el archivo ya tiene todo lo anterior: conversaciones nuevas
+    # (o sin historial) y las que ya paso scripts/archive_chat_history.py.
+    return {
+        "$or": [
+            {"$eq": ["$history_archived", True]},
+            {"$eq": [{"$size": {"$ifNull": ["$history", []]}}, 0]},
+        ]
+    }
+
+
+def _save_messages_update(
+    tenant_id: str,
+    entries: List[Dict[str, Any]],
+    name: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Update con pipeline: agrega los mensajes y recorta el arreglo vivo en la misma escritura.
+
+    Los valores del usuario van en `$literal` para que un "$" en el texto no se lea como campo.
+    """
+    archived = _history_archived_condition()
+    appended = {"$concatArrays": [{"$ifNull": ["$history", []]}, {"$literal": entries}]}
+    fields = {
+        "history_archived": archived,
+        "history": {"$cond": [archived, {"$slice": [appended, -CHAT_HISTORY_MAX_LIVE_MESSAGES]}, appended]},
+        "tenantId": {"$literal": tenant_id},
+        "updated_at": datetime.utcnow(),
+        "support_active": {"$ifNull": ["$support_active", False]},
+    }
+    if name:
+        fields["name"] = {"$literal": name}
+    return [{"$set": fields}]
+
+
+def _state_from_document(tenant_id: str, conversation_id: str, document: Optional[Dict[str, Any]]):
+    return ConversationState(
+        tenant_id=tenant_id,
+        conversation_id=conversation_id,
+        support_active=bool((document or {}).get("support_active", False)),
+        name=(document or {}).get("name"),
+        history=_history_from_document(document),
+    )
+
+
+def _state_update(state: ConversationState):
+    if state.new_messages:
+        return _save_messages_update(state.tenant_id, state.new_messages, state.new_name)
+
+    update = {
+        "$set": {"tenantId": state.tenant_id, "updated_at": datetime.utcnow()},
+        "$setOnInsert": {"history": [], "support_active": False, "history_archived": True},
+    }
+    if state.new_name:
+        update["$set"]["name"] = state.new_name
+    return update
+
+
+def _conversation_name_update(tenant_id: str, name: str) -> Dict[str, Any]:
+    return {
+        "$set": {
+            "tenantId": tenant_id,
+            "name": name,
+            "updated_at": datetime.utcnow(),
+        },
+        "$setOnInsert": {"history": [], "support_active": False, "history_archived": True},
+    }
+
+
+def _support_active_update(tenant_id: str, active: bool) -> Dict[str, Any]:
+    return {
+        "$set": {
+            "tenantId": tenant_id,
+            "support_active": active,
+            "updated_at": datetime.utcnow(),
+        },
+        "$setOnInsert": {"history": [], "history_archived": True},
+    }
+
 
 def get_conversation_document(tenant_id: str, conversation_id: str) -> Optional[Dict[str, Any]]:
-    return collection.find_one({"tenantId": tenant_id, "conversation_id": conversation_id})
+    return collection.find_one(_conversation_filter(tenant_id, conversation_id), HISTORY_PROJECTION)
 
 
 def find_conversation_by_id(conversation_id: str) -> Optional[Dict[str, Any]]:
-    return collection.find_one({"conversation_id": conversation_id})
+    return collection.find_one({"conversation_id": conversation_id}, WITHOUT_HISTORY_PROJECTION)
 
 
 def get_conversation_history(tenant_id: str, conversation_id: str):
-    document = get_conversation_document(tenant_id, conversation_id)
-    if document and "history" in document:
-        return deque(document["history"], maxlen=MAX_HISTORY)
-    return deque(maxlen=MAX_HISTORY)
+    return _history_from_document(get_conversation_document(tenant_id, conversation_id))
 
 
 def save_message(tenant_id: str, conversation_id: str, role: str, content: str):
+    entry = _history_entry(role, content)
     collection.update_one(
-        {"tenantId": tenant_id, "conversation_id": conversation_id},
-        {
-            "$push": {"history": {"role": role, "content": content, "hour": datetime.utcnow()}},
-            "$set": {"tenantId": tenant_id, "updated_at": datetime.utcnow()},
-            "$setOnInsert": {"support_active": False},
-        },
+        _conversation_filter(tenant_id, conversation_id),
+        _save_messages_update(tenant_id, [entry]),
         upsert=True,
     )
+    archive_collection.insert_one(_archive_entry(tenant_id, conversation_id, entry))
+
+
+def load_conversation_state(tenant_id: str, conversation_id: str) -> ConversationState:
+    document = collection.find_one(_conversation_filter(tenant_id, conversation_id), STATE_PROJECTION)
+    return _state_from_document(tenant_id, conversation_id, document)
+
+
+def save_conversation_state(state: ConversationState):
+    if not state.has_changes:
+        return
+
+    collection.update_one(
+        _conversation_filter(state.tenant_id, state.conversation_id),
+        _state_update(state),
+        upsert=True,
+    )
+    if state.new_messages:
+        archive_collection.insert_many(
+            [_archive_entry(state.tenant_id, state.conversation_id, entry) for entry in state.new_messages]
+        )
+    state.new_messages = []
+    state.new_name = None
 
 
 def set_conversation_name(tenant_id: str, conversation_id: str, name: str):
@@ -39,21 +166,14 @@ def set_conversation_name(tenant_id: str, conversation_id: str, name: str):
         return
 
     collection.update_one(
-        {"tenantId": tenant_id, "conversation_id": conversation_id},
-        {
-            "$set": {
-                "tenantId": tenant_id,
-                "name": name,
-                "updated_at": datetime.utcnow(),
-            },
-            "$setOnInsert": {"history": [], "support_active": False},
-        },
+        _conversation_filter(tenant_id, conversation_id),
+        _conversation_name_update(tenant_id, name),
         upsert=True,
     )
 
 
 def is_support_active(tenant_id: str, conversation_id: str) -> bool:
-    document = get_conversation_document(tenant_id, conversation_id)
+    document = collection.find_one(_conversation_filter(tenant_id, conversation_id), {"support_active": 1})
     if not document:
         return False
     return bool(document.get("support_active", False))
@@ -61,14 +181,85 @@ def is_support_active(tenant_id: str, conversation_id: str) -> bool:
 
 def set_support_active(tenant_id: str, conversation_id: str, active: bool):
     collection.update_one(
-        {"tenantId": tenant_id, "conversation_id": conversation_id},
-        {
-            "$set": {
-                "tenantId": tenant_id,
-                "support_active": active,
-                "updated_at": datetime.utcnow(),
-            },
-            "$setOnInsert": {"history": []},
-        },
+        _conversation_filter(tenant_id, conversation_id),
+        _support_active_update(tenant_id, active),
+        upsert=True,
+    )
+
+
+async def aget_conversation_document(tenant_id: str, conversation_id: str) -> Optional[Dict[str, Any]]:
+    return await async_collection.find_one(_conversation_filter(tenant_id, conversation_id), HISTORY_PROJECTION)
+
+
+async def afind_conversation_by_id(conversation_id: str) -> Optional[Dict[str, Any]]:
+    return await async_collection.find_one({"conversation_id": conversation_id}, WITHOUT_HISTORY_PROJECTION)
+
+
+async def aget_conversation_history(tenant_id: str, conversation_id: str):
+    return _history_from_document(await aget_conversation_document(tenant_id, conversation_id))
+
+
+async def asave_message(tenant_id: str, conversation_id: str, role: str, content: str):
+    entry = _history_entry(role, content)
+    await asyncio.gather(
+        async_collection.update_one(
+            _conversation_filter(tenant_id, conversation_id),
+            _save_messages_update(tenant_id, [entry]),
+            upsert=True,
+        ),
+        async_archive_collection.insert_one(_archive_entry(tenant_id, conversation_id, entry)),
+    )
+
+
+async def aload_conversation_state(tenant_id: str, conversation_id: str) -> ConversationState:
+    document = await async_collection.find_one(_conversation_filter(tenant_id, conversation_id), STATE_PROJECTION)
+    return _state_from_document(tenant_id, conversation_id, document)
+
+
+async def asave_conversation_state(state: ConversationState):
+    """Escribe en una sola operacion los mensajes y el nombre acumulados durante el turno."""
+    if not state.has_changes:
+        return
+
+    writes = [
+        async_collection.update_one(
+            _conversation_filter(state.tenant_id, state.conversation_id),
+            _state_update(state),
+            upsert=True,
+        )
+    ]
+    if state.new_messages:
+        writes.append(
+            async_archive_collection.insert_many(
+                [_archive_entry(state.tenant_id, state.conversation_id, entry) for entry in state.new_messages]
+            )
+        )
+    await asyncio.gather(*writes)
+    state.new_messages = []
+    state.new_name = None
+
+
+async def aset_conversation_name(tenant_id: str, conversation_id: str, name: str):
+    if not name:
+        return
+
+    await async_collection.update_one(
+        _conversation_filter(tenant_id, conversation_id),
+        _conversation_name_update(tenant_id, name),
+        upsert=True,
+    )
+
+
+async def ais_support_active(tenant_id: str, conversation_id: str) -> bool:
+    document = await async_collection.find_one(_conversation_filter(tenant_id, conversation_id), {"support_active": 1})
+    if not document:
+        return False
+    return bool(document.get("support_active", False))
+
+
+async def aset_support_active(tenant_id: str, conversation_id: str, active: bool):
+    await async_collection.update_one(
+        _conversation_filter(tenant_id, conversation_id),
+        _support_active_update(tenant_id, active),
         upsert=True,
     )
@@ -0,0 +1,90 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.shared.config.settings import CONTEXT_HISTORY_SHARE, CONTEXT_TOKEN_BUDGET, CONTEXT_TOKEN_BUDGET_BY_TENANT
+from app.shared.types.prompts import TurnContext
+from app.shared.utils.tokens import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Turnos mas recientes que se conservan completos; los anteriores se recortan a OLDER_TURN_MAX_TOKENS.
+RECENT_TURNS = 4
+OLDER_TURN_MAX_TOKENS = 80
+# Por debajo de este espacio libre no vale la pena meter un fragmento recortado.
+MIN_CHUNK_TOKENS = 40
+
+
+def get_context_budget(tenant_id: Optional[str]) -> int:
+    return CONTEXT_TOKEN_BUDGET_BY_TENANT.get(tenant_id, CONTEXT_TOKEN_BUDGET)
+
+
+def _pack_history(history: Iterable[Dict], budget: int) -> Tuple[List[str], int, int]:
+    """Llena el presupuesto del turno mas reciente al mas antiguo."""
+    messages = list(history or [])
+    lines: List[str] = []
+    used = 0
+    for index, message in enumerate(reversed(messages)):
+        limit = budget - used
+        if index >= RECENT_TURNS:
+            limit = min(limit, OLDER_TURN_MAX_TOKENS)
+        if limit < MIN_CHUNK_TOKENS:
+            return list(reversed(lines)), used, len(messages) - index
+
+        prefix = "Usuario:" if message["role"] == "user" else "Asistente:"
+        line = f"{prefix} {truncate_tokens(message['content'], limit - count_tokens(prefix) - 1)}"
+        lines.append(line)
+        used += count_tokens(line)
+    return list(reversed(lines)), used, 0
+
+
+def _pack_chunks(chunks: Iterable[str], budget: int) -> Tuple[List[str], int, int]:
+    """Mete los fragmentos en orden de relevancia; el que no cabe completo se recorta."""
+    packed: List[str] = []
+    seen = set()
+    used = 0
+    dropped = 0
+    for chunk in chunks:
+        if not chunk or chunk in seen:
+            continue
+        seen.add(chunk)
+
+        remaining = budget - used
+        if remaining < MIN_CHUNK_TOKENS:
+            dropped += 1
+            continue
+        tokens = count_tokens(chunk)
+        if tokens > remaining:
+            chunk = truncate_tokens(chunk, remaining)
+            tokens = count_tokens(chunk)
+        packed.append(chunk)
+        used += tokens
+    return packed, used, dropped
+
+
+def build_turn_context(history, chunks: List[str], tenant_id: Optional[str]) -> TurnContext:
+    """Arma historial y contexto dentro del presupuesto de tokens del tenant.
+
+    `chunks` debe venir ordenado por relevancia (como lo devuelve FAISS). El historial
+    usa hasta `CONTEXT_HISTORY_SHARE` del presupuesto y lo que no use pasa al contexto.
+    """
+    budget = get_context_budget(tenant_id)
+    history_lines, history_tokens, dropped_turns = _pack_history(history, int(budget * CONTEXT_HISTORY_SHARE))
+    packed_chunks, context_tokens, dropped_chunks = _pack_chunks(chunks, budget - history_tokens)
+
+    if dropped_turns or dropped_chunks:
+        logger.info(
+            "Context trimmed to budget tenant=%s budget=%s dropped_turns=%s dropped_chunks=%s",
+            tenant_id,
+            budget,
+            dropped_turns,
+            dropped_chunks,
+        )
+    return TurnContext(
+        history="\n".join(history_lines),
+        context="\n".join(packed_chunks),
+        budget=budget,
+        history_tokens=history_tokens,
+        context_tokens=context_tokens,
+        dropped_turns=dropped_turns,
+        dropped_chunks=dropped_chunks,
+    )
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict
+
+from app.shared.config.settings import WEBHOOK_WORKER_CONCURRENCY
+from app.shared.utils.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+class ConversationWorkerPool:
+    """Ejecuta trabajos de webhooks en segundo plano.
+
+    Los trabajos de una misma conversacion corren uno tras otro en orden de llegada;
+    conversaciones distintas corren en paralelo hasta `max_concurrency`.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore = None
+        self._pending: Dict[str, Deque[Job]] = {}
+        self._drainers: Dict[str, asyncio.Task] = {}
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, conversation_id: str, job: Job):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._pending.setdefault(conversation_id, deque()).append(job)
+        if conversation_id not in self._drainers:
+            self._drainers[conversation_id] = asyncio.create_task(self._drain(conversation_id))
+
+    async def _drain(self, conversation_id: str):
+        queue = self._pending[conversation_id]
+        try:
+            while queue:
+                job = queue.popleft()
+                async with self._semaphore:
+                    try:
+                        await job()
+                        self.completed += 1
+                    except Exception as exc:
+                        self.failed += 1
+                        logger.exception("Conversation job failed conversation=%s: %s", conversation_id, str(exc))
+        finally:
+            self._pending.pop(conversation_id, None)
+            self._drainers.pop(conversation_id, None)
+
+    async def stop(self, drain_timeout: float):
+        drainers = list(self._drainers.values())
+        if not drainers:
+            return
+        _, still_running = await asyncio.wait(drainers, timeout=drain_timeout)
+        if still_running:
+            logger.warning("Conversation workers stopped with %s jobs pending", self.backlog())
+            for task in still_running:
+                task.cancel()
+            await asyncio.gather(*still_running, return_exceptions=True)
+
+    def backlog(self) -> int:
+        return sum(len(queue) for queue in self._pending.values())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active_conversations": len(self._drainers),
+            "backlog": self.backlog(),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+conversation_workers = ConversationWorkerPool(WEBHOOK_WORKER_CONCURRENCY)
+register_metrics("conversation_workers", conversation_workers.stats)
@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from langchain.embeddings.base import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# SQLite limita las variables por sentencia (999 en versiones viejas); se consulta por tandas.
+LOOKUP_CHUNK_SIZE = 500
+
+
+class CachedEmbeddings(Embeddings):
+    """Envuelve un modelo de embeddings con cache LRU en memoria y respaldo en SQLite.
+
+    Las entradas se direccionan por contenido: sha256 del nombre del modelo y el texto.
+    """
+
+    def __init__(self, model: Embeddings, store_path: str = "", memory_size: int = 4096):
+        self.model = model
+        self.model_name = getattr(model, "model", None) or type(model).__name__
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = self._open_store(store_path) if store_path else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _open_store(self, store_path: str) -> Optional[sqlite3.Connection]:
+        try:
+            directory = os.path.dirname(store_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(store_path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)"
+            )
+            connection.commit()
+            logger.info("Embedding cache store opened: %s", store_path)
+            return connection
+        except sqlite3.Error as exc:
+            logger.warning("Could not open embedding cache store %s: %s", store_path, str(exc))
+            return None
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        disk_keys = []
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is None:
+                    disk_keys.append(key)
+                    continue
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                found[key] = vector
+
+            if disk_keys and self._connection is not None:
+                for start in range(0, len(disk_keys), LOOKUP_CHUNK_SIZE):
+                    chunk = disk_keys[start:start + LOOKUP_CHUNK_SIZE]
+                    placeholders = ",".join("?" for _ in chunk)
+                    rows = self._connection.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = array("f", blob).tolist()
+                        self._remember(key, vector)
+                        self.disk_hits += 1
+                        found[key] = vector
+
+            self.misses += len([key for key in keys if key not in found])
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]):
+        if not vectors:
+            return
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+            if self._connection is None:
+                return
+            try:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                    [(key, self.model_name, array("f", vector).tobytes()) for key, vector in vectors.items()],
+                )
+                self._connection.commit()
+            except sqlite3.Error as exc:
+                logger.warning("Could not persist embeddings: %s", str(exc))
+
+    def _resolve(self, texts: List[str]):
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+        missing = {}
+        for text, key in zip(texts, keys):
+            if key not in found:
+                missing.setdefault(key, text)
+        return keys, found, missing
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._resolve(texts)
+        if missing:
+            computed = dict(zip(missing.keys(), self.model.embed_documents(list(missing.values()))))
+            self._store(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._resolve([text])
+        if missing:
+            computed = {keys[0]: self.model.embed_query(text)}
+            self._store(computed)
+            found.update(computed)
+        return found[keys[0]]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Las consultas a SQLite son bloqueantes; en la ruta async corren en un hilo.
+        keys, found, missing = await asyncio.to_thread(self._resolve, texts)
+        if missing:
+            computed = dict(zip(missing.keys(), await self.model.aembed_documents(list(missing.values()))))
+            await asyncio.to_thread(self._store, computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, missing = await asyncio.to_thread(self._resolve, [text])
+        if missing:
+            computed = {keys[0]: await self.model.aembed_query(text)}
+            await asyncio.to_thread(self._store, computed)
+            found.update(computed)
+        return found[keys[0]]
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "model": self.model_name,
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "persistent": self._connection is not None,
+            }
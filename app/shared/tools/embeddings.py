@@ -1,47 +1,80 @@
 import logging
 import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
 
 from langchain.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings
 
 from app.shared.config.database import knowledge_collection
-from app.shared.config.settings import FAISS_PATH, OPENAI_API_KEY
+from app.shared.config.settings import (
+    EMBEDDING_CACHE_MEMORY_SIZE,
+    EMBEDDING_CACHE_PATH,
+    FAISS_MAX_LOADED_SHARDS,
+    FAISS_PATH,
+    OPENAI_API_KEY,
+    TENANT_ID,
+)
+from app.shared.tools.embedding_cache import CachedEmbeddings
+from app.shared.utils.metrics import register_metrics
 
 logger = logging.getLogger(__name__)
 
-embeddings_model = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-vector_store = None
+embeddings_model = CachedEmbeddings(
+    OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY),
+    store_path=EMBEDDING_CACHE_PATH,
+    memory_size=EMBEDDING_CACHE_MEMORY_SIZE,
+)
+register_metrics("embedding_cache", embeddings_model.stats)
 
+# Shards residentes en memoria: tenant_id -> (version en disco, FAISS o None si el tenant no tiene conocimiento).
+_loaded_shards: "OrderedDict[str, tuple]" = OrderedDict()
+_shards_lock = threading.Lock()
+# Locks por franjas: cantidad fija sin importar cuantos tenants se vean; dos tenants de la misma
+# franja solo comparten la espera mientras se carga o escribe un shard.
+TENANT_LOCK_STRIPES = 64
+_tenant_locks = [threading.RLock() for _ in range(TENANT_LOCK_STRIPES)]
 
-def _load_local_index():
+
+def tenant_shard_path(tenant_id: str) -> str:
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", tenant_id or "")
+    if safe_name in ("", ".", ".."):
+        safe_name = f"_{safe_name.replace('.', '_')}"
+    return os.path.join(FAISS_PATH, safe_name)
+
+
+def get_shard_version(tenant_id: str) -> int:
+    """Version del shard en disco; cambia cada vez que se reescribe el indice del tenant."""
+    try:
+        return os.stat(os.path.join(tenant_shard_path(tenant_id), "index.faiss")).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _tenant_filter(tenant_id: str):
+    return {"$or": [{"tenantId": tenant_id}, {"tenant_id": tenant_id}]}
+
+
+def _load_local_index(path: str):
     try:
         return FAISS.load_local(
-            FAISS_PATH,
+            path,
             embeddings_model,
             allow_dangerous_deserialization=True,
         )
     except TypeError:
-        return FAISS.load_local(FAISS_PATH, embeddings_model)
-
-
-def init_faiss():
-    global vector_store
+        return FAISS.load_local(path, embeddings_model)
 
-    if os.path.exists(FAISS_PATH):
-        try:
-            vector_store = _load_local_index()
-            logger.info("FAISS loaded from disk: %s", FAISS_PATH)
-            return
-        except Exception as exc:
-            logger.warning("Could not load FAISS from disk: %s", str(exc))
 
+def _build_shard_from_mongo(tenant_id: str):
     texts = []
     metadatas = []
-    for document in knowledge_collection.find({}):
+    for document in knowledge_collection.find(_tenant_filter(tenant_id)):
         text = document.get("text")
         if not text:
             continue
-        tenant_id = document.get("tenantId") or document.get("tenant_id")
         texts.append(text)
         metadatas.append(
             {
@@ -52,32 +85,103 @@ def init_faiss():
             }
         )
 
-    if texts:
-        os.makedirs(FAISS_PATH, exist_ok=True)
-        vector_store = FAISS.from_texts(texts, embeddings_model, metadatas=metadatas)
-        vector_store.save_local(FAISS_PATH)
-        logger.info("FAISS created from Mongo and saved to disk: %s", FAISS_PATH)
-    else:
-        vector_store = None
-        logger.info("Knowledge base is empty. FAISS not initialized.")
+    if not texts:
+        logger.info("Knowledge base is empty for tenant=%s. FAISS shard not initialized.", tenant_id)
+        return None
 
+    path = tenant_shard_path(tenant_id)
+    os.makedirs(path, exist_ok=True)
+    store = FAISS.from_texts(texts, embeddings_model, metadatas=metadatas)
+    store.save_local(path)
+    logger.info("FAISS shard created from Mongo for tenant=%s docs=%s: %s", tenant_id, len(texts), path)
+    return store
 
-def add_document(text: str, tenant_id: str):
-    global vector_store
 
-    embedding = embeddings_model.embed_query(text)
-    knowledge_collection.insert_one(
-        {
-            "text": text,
-            "embedding": embedding,
-            "tenantId": tenant_id,
-            "tenant_id": tenant_id,
-        }
-    )
+def _load_shard(tenant_id: str):
+    path = tenant_shard_path(tenant_id)
+    if os.path.exists(os.path.join(path, "index.faiss")):
+        try:
+            store = _load_local_index(path)
+            logger.info("FAISS shard loaded from disk for tenant=%s: %s", tenant_id, path)
+            return store
+        except Exception as exc:
+            logger.warning("Could not load FAISS shard for tenant=%s: %s", tenant_id, str(exc))
+    return _build_shard_from_mongo(tenant_id)
+
+
+def _remember_shard(tenant_id: str, store):
+    _loaded_shards[tenant_id] = (get_shard_version(tenant_id), store)
+    _loaded_shards.move_to_end(tenant_id)
+    while len(_loaded_shards) > FAISS_MAX_LOADED_SHARDS:
+        evicted_tenant, _ = _loaded_shards.popitem(last=False)
+        logger.info("FAISS shard evicted from memory for tenant=%s", evicted_tenant)
+
+
+def _get_tenant_lock(tenant_id: str):
+    return _tenant_locks[zlib.crc32((tenant_id or "").encode("utf-8")) % TENANT_LOCK_STRIPES]
+
 
+def _get_loaded_shard(tenant_id: str):
+    version = get_shard_version(tenant_id)
+    with _shards_lock:
+        entry = _loaded_shards.get(tenant_id)
+        if entry is None or entry[0] != version:
+            return False, None
+        _loaded_shards.move_to_end(tenant_id)
+        return True, entry[1]
+
+
+def get_tenant_store(tenant_id: str):
+    # Un shard residente se recarga si otro proceso (p. ej. regenerate_faiss.py) reescribio el indice.
+    loaded, store = _get_loaded_shard(tenant_id)
+    if loaded:
+        return store
+
+    with _get_tenant_lock(tenant_id):
+        loaded, store = _get_loaded_shard(tenant_id)
+        if loaded:
+            return store
+
+        store = _load_shard(tenant_id)
+        with _shards_lock:
+            _remember_shard(tenant_id, store)
+        return store
+
+
+def evict_tenant_store(tenant_id: str):
+    with _shards_lock:
+        _loaded_shards.pop(tenant_id, None)
+
+
+def init_faiss():
+    os.makedirs(FAISS_PATH, exist_ok=True)
+    try:
+        get_tenant_store(TENANT_ID)
+    except Exception as exc:
+        logger.warning("Could not preload FAISS shard for tenant=%s: %s", TENANT_ID, str(exc))
+
+
+def add_document(text: str, tenant_id: str):
+    embedding = embeddings_model.embed_query(text)
     metadata = {"tenantId": tenant_id, "tenant_id": tenant_id}
-    if vector_store is None:
-        vector_store = FAISS.from_texts([text], embeddings_model, metadatas=[metadata])
-    else:
-        vector_store.add_texts([text], metadatas=[metadata])
-    vector_store.save_local(FAISS_PATH)
+    path = tenant_shard_path(tenant_id)
+
+    with _get_tenant_lock(tenant_id):
+        store = get_tenant_store(tenant_id)
+        knowledge_collection.insert_one(
+            {
+                "text": text,
+                "embedding": embedding,
+                "tenantId": tenant_id,
+                "tenant_id": tenant_id,
+            }
+        )
+
+        if store is None:
+            store = FAISS.from_embeddings([(text, embedding)], embeddings_model, metadatas=[metadata])
+        else:
+            store.add_embeddings([(text, embedding)], metadatas=[metadata])
+        os.makedirs(path, exist_ok=True)
+        store.save_local(path)
+        with _shards_lock:
+            _remember_shard(tenant_id, store)
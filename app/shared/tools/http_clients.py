@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Tuple
+
+import aiohttp
+
+from app.shared.config.settings import (
+    GRAPH_HTTP_DNS_CACHE_SECONDS,
+    GRAPH_HTTP_KEEPALIVE_SECONDS,
+    GRAPH_HTTP_MAX_CONNECTIONS,
+    GRAPH_HTTP_MAX_CONNECTIONS_PER_HOST,
+    GRAPH_HTTP_TIMEOUT_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# nombre -> (loop dueño, sesion). Una aiohttp.ClientSession solo se puede usar en el loop donde se creo.
+_sessions: Dict[str, Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+
+
+def get_session(name: str, factory: Callable[[], aiohttp.ClientSession]) -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    entry = _sessions.get(name)
+    if entry is not None:
+        owner_loop, session = entry
+        if owner_loop is loop and not session.closed:
+            return session
+
+    session = factory()
+    _sessions[name] = (loop, session)
+    logger.info("HTTP client session created: %s", name)
+    return session
+
+
+def get_api_session() -> aiohttp.ClientSession:
+    """Sesion compartida para la API interna (`API_BASE_URL`): calendario y disponibilidad."""
+    return get_session(
+        "api",
+        lambda: aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=30),
+            timeout=aiohttp.ClientTimeout(total=15),
+        ),
+    )
+
+
+def get_graph_session() -> aiohttp.ClientSession:
+    """Sesion compartida para la Graph API de Meta (WhatsApp, Messenger, Instagram)."""
+    return get_session(
+        "graph",
+        lambda: aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=GRAPH_HTTP_MAX_CONNECTIONS,
+                limit_per_host=GRAPH_HTTP_MAX_CONNECTIONS_PER_HOST,
+                ttl_dns_cache=GRAPH_HTTP_DNS_CACHE_SECONDS,
+                keepalive_timeout=GRAPH_HTTP_KEEPALIVE_SECONDS,
+            ),
+            timeout=aiohttp.ClientTimeout(total=GRAPH_HTTP_TIMEOUT_SECONDS),
+        ),
+    )
+
+
+async def close_http_clients():
+    loop = asyncio.get_running_loop()
+    for name, (owner_loop, session) in list(_sessions.items()):
+        if owner_loop is loop and not session.closed:
+            await session.close()
+            logger.info("HTTP client session closed: %s", name)
+    _sessions.clear()
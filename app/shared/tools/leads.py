@@ -1,9 +1,9 @@
 from datetime import datetime
 
-from app.shared.config.database import leads_collection
+from app.shared.config.database import async_leads_collection, leads_collection
 
 
-def create_lead(data: dict) -> str:
+def _build_lead_payload(data: dict) -> dict:
     if not isinstance(data, dict) or not data:
         raise ValueError("Lead data must be a non-empty dictionary")
 
@@ -28,6 +28,14 @@ def create_lead(data: dict) -> str:
     payload.setdefault("created_at", datetime.utcnow())
     payload.setdefault("updated_at", datetime.utcnow())
     payload.setdefault("status", "nuevo")
+    return payload
+
+
+def create_lead(data: dict) -> str:
+    result = leads_collection.insert_one(_build_lead_payload(data))
+    return str(result.inserted_id)
+
 
-    result = leads_collection.insert_one(payload)
+async def acreate_lead(data: dict) -> str:
+    result = await async_leads_collection.insert_one(_build_lead_payload(data))
     return str(result.inserted_id)
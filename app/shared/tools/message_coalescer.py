@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from functools import partial
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.shared.config.settings import MESSAGE_DEBOUNCE_MAX_WAIT_SECONDS, MESSAGE_DEBOUNCE_SECONDS_BY_CHANNEL
+from app.shared.tools.conversation_workers import ConversationWorkerPool, conversation_workers
+from app.shared.tools.message_dedup import MessageDeduplicator, message_deduplicator
+from app.shared.utils.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+TurnHandler = Callable[[str], Awaitable[None]]
+
+
+class _PendingTurn:
+    def __init__(self, channel: str, handler: TurnHandler, first_at: float):
+        self.channel = channel
+        self.handler = handler
+        self.first_at = first_at
+        self.texts: List[str] = []
+        self.message_ids: List[Optional[str]] = []
+        self.timer = None
+
+
+class MessageCoalescer:
+    """Junta mensajes seguidos de una conversacion en un solo turno del asistente.
+
+    Cada mensaje nuevo reinicia la ventana de espera del canal; el turno sale al
+    vencer la ventana o al cumplirse `max_wait_seconds` desde el primer mensaje.
+    """
+
+    def __init__(
+        self,
+        workers: ConversationWorkerPool,
+        windows_by_channel: Dict[str, float],
+        max_wait_seconds: float,
+        deduplicator: MessageDeduplicator,
+    ):
+        self.workers = workers
+        self.deduplicator = deduplicator
+        self.windows_by_channel = windows_by_channel
+        self.max_wait_seconds = max_wait_seconds
+        self._pending: Dict[str, _PendingTurn] = {}
+        self.turns = 0
+        self.merged_messages = 0
+
+    def add(self, channel: str, conversation_id: str, text: str, handler: TurnHandler, message_id: str = None):
+        window = self.windows_by_channel.get(channel, 0)
+        if window <= 0:
+            self.turns += 1
+            self.workers.submit(conversation_id, self.deduplicator.guard(channel, [message_id], partial(handler, text)))
+            return
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        turn = self._pending.get(conversation_id)
+        if turn is None:
+            turn = _PendingTurn(channel, handler, now)
+            self._pending[conversation_id] = turn
+        else:
+            turn.timer.cancel()
+            turn.handler = handler
+
+        turn.texts.append(text)
+        turn.message_ids.append(message_id)
+        delay = min(window, turn.first_at + self.max_wait_seconds - now)
+        turn.timer = loop.call_later(max(0.0, delay), self.flush, conversation_id)
+
+    def flush(self, conversation_id: str):
+        turn = self._pending.pop(conversation_id, None)
+        if turn is None:
+            return
+        turn.timer.cancel()
+        self.turns += 1
+        self.merged_messages += len(turn.texts) - 1
+        if len(turn.texts) > 1:
+            logger.info("Coalesced %s messages into one turn conversation=%s", len(turn.texts), conversation_id)
+        job = partial(turn.handler, "\n".join(turn.texts))
+        self.workers.submit(conversation_id, self.deduplicator.guard(turn.channel, turn.message_ids, job))
+
+    def flush_all(self):
+        for conversation_id in list(self._pending):
+            self.flush(conversation_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "waiting_conversations": len(self._pending),
+            "turns": self.turns,
+            "merged_messages": self.merged_messages,
+        }
+
+
+message_coalescer = MessageCoalescer(
+    conversation_workers,
+    MESSAGE_DEBOUNCE_SECONDS_BY_CHANNEL,
+    MESSAGE_DEBOUNCE_MAX_WAIT_SECONDS,
+    message_deduplicator,
+)
+register_metrics("message_coalescer", message_coalescer.stats)
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.shared.config.database import async_webhook_dedup_collection
+from app.shared.config.settings import (
+    WEBHOOK_DEDUP_MAX_ENTRIES,
+    WEBHOOK_DEDUP_STORE,
+    WEBHOOK_DEDUP_TTL_SECONDS,
+)
+from app.shared.utils.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+class MessageDeduplicator:
+    """Descarta reentregas de webhooks por ID de mensaje de la plataforma.
+
+    Siempre usa un set en memoria con TTL y tamano acotado; con `collection` ademas
+    reclama cada ID en Mongo (`_id` unico + indice TTL de `config/indexes.py`) para compartirlo entre workers.
+    El ID se reclama al recibirlo; si el turno falla, `guard` lo libera para que la reentrega se procese.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, collection=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.collection = collection
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self.accepted = 0
+        self.suppressed = 0
+        self.released = 0
+
+    def _seen_recently(self, key: str, now: float) -> bool:
+        expires_at = self._seen.get(key)
+        if expires_at is not None and expires_at > now:
+            return True
+
+        self._seen[key] = now + self.ttl_seconds
+        self._seen.move_to_end(key)
+        while self._seen:
+            oldest_key, oldest_expiry = next(iter(self._seen.items()))
+            if len(self._seen) <= self.max_entries and oldest_expiry > now:
+                break
+            self._seen.pop(oldest_key)
+        return False
+
+    async def _claim_in_store(self, key: str) -> bool:
+        try:
+            await self.collection.insert_one({"_id": key, "created_at": datetime.utcnow()})
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def claim(self, platform: str, message_id: Optional[str]) -> bool:
+        """True si el mensaje es nuevo y debe procesarse; False si es una reentrega."""
+        if not message_id:
+            return True
+
+        key = f"{platform}:{message_id}"
+        is_new = not self._seen_recently(key, time.monotonic())
+        if is_new and self.collection is not None:
+            try:
+                is_new = await self._claim_in_store(key)
+            except Exception as exc:
+                logger.warning("Webhook dedup store unavailable, using memory only: %s", str(exc))
+
+        if is_new:
+            self.accepted += 1
+        else:
+            self.suppressed += 1
+            logger.info("Duplicate webhook message suppressed platform=%s id=%s", platform, message_id)
+        return is_new
+
+    async def release(self, platform: str, message_ids: Iterable[Optional[str]]):
+        """Olvida los IDs de mensajes que no se alcanzaron a procesar."""
+        keys = [f"{platform}:{message_id}" for message_id in message_ids if message_id]
+        if not keys:
+            return
+        for key in keys:
+            self._seen.pop(key, None)
+        if self.collection is not None:
+            try:
+                await self.collection.delete_many({"_id": {"$in": keys}})
+            except Exception as exc:
+                logger.warning("Could not release webhook dedup claims %s: %s", ",".join(keys), str(exc))
+        self.released += len(keys)
+        logger.info("Webhook dedup claims released platform=%s count=%s", platform, len(keys))
+
+    def guard(self, platform: str, message_ids: Iterable[Optional[str]], job: Job) -> Job:
+        """Envuelve el turno de unos mensajes: si falla o se cancela, libera sus IDs."""
+        message_ids = list(message_ids)
+
+        async def run():
+            try:
+                await job()
+            except (Exception, asyncio.CancelledError):
+                await self.release(platform, message_ids)
+                raise
+
+        return run
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "store": "mongo" if self.collection is not None else "memory",
+            "tracked": len(self._seen),
+            "accepted": self.accepted,
+            "suppressed": self.suppressed,
+            "released": self.released,
+        }
+
+
+message_deduplicator = MessageDeduplicator(
+    ttl_seconds=WEBHOOK_DEDUP_TTL_SECONDS,
+    max_entries=WEBHOOK_DEDUP_MAX_ENTRIES,
+    collection=async_webhook_dedup_collection if WEBHOOK_DEDUP_STORE == "mongo" else None,
+)
+register_metrics("webhook_dedup", message_deduplicator.stats)
@@ -4,6 +4,16 @@ from fastapi import HTTPException
 
 from app.modules.meta.tools.service import meta_messaging_service
 from app.modules.whatsapp.tools.service import whatsapp_service
+from app.shared.config.database import async_outbound_collection
+from app.shared.config.settings import (
+    OUTBOUND_MAX_ATTEMPTS,
+    OUTBOUND_RECLAIM_INTERVAL_SECONDS,
+    OUTBOUND_RETRY_BASE_SECONDS,
+    OUTBOUND_RETRY_MAX_SECONDS,
+    OUTBOUND_WORKERS,
+)
+from app.shared.tools.outbound_queue import OutboundQueue
+from app.shared.utils.metrics import register_metrics
 
 
 def parse_conversation_target(conversation_id: str) -> Tuple[str, str]:
@@ -20,9 +30,7 @@ def parse_conversation_target(conversation_id: str) -> Tuple[str, str]:
     return normalized_platform, recipient
 
 
-async def send_message_to_conversation(conversation_id: str, message: str):
-    platform, recipient = parse_conversation_target(conversation_id)
-
+async def deliver_message(platform: str, recipient: str, message: str):
     if platform == "whatsapp":
         await whatsapp_service.send_text_message(recipient, message)
         return
@@ -32,3 +40,24 @@ async def send_message_to_conversation(conversation_id: str, message: str):
         recipient_id=recipient,
         message=message,
     )
+
+
+outbound_queue = OutboundQueue(
+    async_outbound_collection,
+    deliver_message,
+    workers=OUTBOUND_WORKERS,
+    max_attempts=OUTBOUND_MAX_ATTEMPTS,
+    retry_base_seconds=OUTBOUND_RETRY_BASE_SECONDS,
+    retry_max_seconds=OUTBOUND_RETRY_MAX_SECONDS,
+    reclaim_interval_seconds=OUTBOUND_RECLAIM_INTERVAL_SECONDS,
+)
+register_metrics("outbound_queue", outbound_queue.stats)
+
+
+async def enqueue_outbound_message(platform: str, recipient: str, message: str):
+    return await outbound_queue.enqueue(platform, recipient, message)
+
+
+async def send_message_to_conversation(conversation_id: str, message: str):
+    platform, recipient = parse_conversation_target(conversation_id)
+    await enqueue_outbound_message(platform, recipient, message)
@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import random
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+from app.shared.types.graph_api import GraphAPIError
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+# Tiempo que un proceso se reserva un envio; mientras siga en memoria, el lease se renueva.
+# Si el proceso muere, pasado este plazo otro proceso lo recupera.
+LEASE = timedelta(minutes=2)
+LEASE_RENEW_SECONDS = LEASE.total_seconds() / 3
+
+
+class OutboundQueue:
+    """Cola de envios salientes persistida en Mongo.
+
+    Cada destinatario cae siempre en el mismo worker (hash del destinatario), asi que sus
+    mensajes salen en orden. Los errores transitorios y los limites de tasa de la Graph API
+    se reintentan con backoff exponencial: el envio vuelve a Mongo con `locked_until` en la
+    hora del reintento y los siguientes del mismo destinatario esperan detras de el, sin
+    frenar a los demas destinatarios del worker.
+    """
+
+    def __init__(
+        self,
+        collection,
+        deliver: Callable[[str, str, str], Awaitable[Any]],
+        workers: int,
+        max_attempts: int,
+        retry_base_seconds: float,
+        retry_max_seconds: float,
+        reclaim_interval_seconds: float,
+    ):
+        self.collection = collection
+        self.deliver = deliver
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.reclaim_interval_seconds = reclaim_interval_seconds
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._reclaim_task = None
+        # Envios reservados por este proceso (en cola o enviandose): _id -> job.
+        self._held: Dict[Any, Dict[str, Any]] = {}
+        # Destinatarios con un reintento programado: (plataforma, destinatario) -> (_id, hora del reintento).
+        self._parked: Dict[Tuple[str, str], Tuple[Any, datetime]] = {}
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def _ensure_workers(self):
+        if self._tasks:
+            return
+        self._queues = [asyncio.Queue() for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._work(queue)) for queue in self._queues]
+
+    def _dispatch(self, job: Dict[str, Any]):
+        if job["_id"] in self._held:
+            return False
+        self._held[job["_id"]] = job
+        shard = zlib.crc32(f"{job['platform']}:{job['recipient']}".encode("utf-8")) % self.workers
+        self._queues[shard].put_nowait(job)
+        return True
+
+    async def enqueue(self, platform: str, recipient: str, message: str):
+        self._ensure_workers()
+        now = datetime.utcnow()
+        job = {
+            "platform": platform,
+            "recipient": recipient,
+            "message": message,
+            "status": STATUS_PENDING,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+            "locked_until": now + LEASE,
+        }
+        result = await self.collection.insert_one(job)
+        job["_id"] = result.inserted_id
+        self._dispatch(job)
+        return result.inserted_id
+
+    async def _recover(self) -> int:
+        recovered = 0
+        while True:
+            now = datetime.utcnow()
+            job = await self.collection.find_one_and_update(
+                {"status": STATUS_PENDING, "locked_until": {"$lte": now}},
+                {"$set": {"locked_until": now + LEASE, "updated_at": now}},
+                sort=[("created_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if job is None:
+                return recovered
+            recovered += int(self._dispatch(job))
+
+    async def _renew_leases(self):
+        if not self._held:
+            return
+        now = datetime.utcnow()
+        await self.collection.update_many(
+            {"_id": {"$in": list(self._held)}, "status": STATUS_PENDING},
+            {"$set": {"locked_until": now + LEASE, "updated_at": now}},
+        )
+
+    async def _reclaim(self):
+        """Recupera periodicamente envios con lease vencido: reintentos programados y los de procesos caidos."""
+        last_renew = asyncio.get_running_loop().time()
+        while True:
+            await asyncio.sleep(self.reclaim_interval_seconds)
+            try:
+                if asyncio.get_running_loop().time() - last_renew >= LEASE_RENEW_SECONDS:
+                    await self._renew_leases()
+                    last_renew = asyncio.get_running_loop().time()
+                recovered = await self._recover()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Outbound queue reclaim failed: %s", str(exc))
+                continue
+            if recovered:
+                logger.info("Outbound queue reclaimed %s pending messages", recovered)
+
+    async def start(self):
+        self._ensure_workers()
+        if self._reclaim_task is None:
+            self._reclaim_task = asyncio.create_task(self._reclaim())
+        try:
+            recovered = await self._recover()
+        except Exception as exc:
+            logger.warning("Outbound queue recovery failed: %s", str(exc))
+            return
+        if recovered:
+            logger.info("Outbound queue recovered %s pending messages", recovered)
+
+    async def _release_leases(self):
+        """Libera lo que quedo sin enviar para que otro proceso lo tome sin esperar el lease."""
+        if not self._held:
+            return
+        try:
+            result = await self.collection.update_many(
+                {"_id": {"$in": list(self._held)}, "status": STATUS_PENDING},
+                {"$set": {"locked_until": datetime.utcnow()}},
+            )
+            logger.info("Outbound queue released %s pending messages", result.modified_count)
+        except Exception as exc:
+            logger.warning("Could not release outbound leases: %s", str(exc))
+        self._held = {}
+
+    async def stop(self, drain_timeout: float):
+        if self._reclaim_task is not None:
+            self._reclaim_task.cancel()
+            await asyncio.gather(self._reclaim_task, return_exceptions=True)
+            self._reclaim_task = None
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Outbound queue drain timed out with %s messages queued", self._backlog())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queues = []
+        await self._release_leases()
+
+    def _retry_delay(self, attempts: int, error: Exception) -> float:
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** (attempts - 1)))
+        if isinstance(error, GraphAPIError) and error.retry_after:
+            delay = max(delay, error.retry_after)
+        return delay * random.uniform(0.8, 1.2)
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, GraphAPIError):
+            return error.is_retryable
+        if isinstance(error, HTTPException):
+            return error.status_code >= 500
+        return True
+
+    async def _mark(self, job: Dict[str, Any], update: Dict[str, Any]):
+        update.setdefault("updated_at", datetime.utcnow())
+        try:
+            await self.collection.update_one({"_id": job["_id"]}, {"$set": update})
+        except Exception as exc:
+            logger.warning("Could not update outbound message %s: %s", job["_id"], str(exc))
+
+    @staticmethod
+    def _recipient_key(job: Dict[str, Any]) -> Tuple[str, str]:
+        return job["platform"], job["recipient"]
+
+    def _blocking_retry(self, job: Dict[str, Any]) -> Optional[datetime]:
+        """Hora del reintento que debe salir antes que `job` (mismo destinatario), si hay uno."""
+        key = self._recipient_key(job)
+        parked = self._parked.get(key)
+        if parked is None:
+            return None
+        parked_id, retry_at = parked
+        if parked_id == job["_id"] or retry_at + LEASE < datetime.utcnow():
+            # Es el propio reintento, o se perdio de vista (otro proceso lo tomo): deja de bloquear.
+            del self._parked[key]
+            return None
+        return retry_at
+
+    async def _process(self, job: Dict[str, Any]):
+        retry_at = self._blocking_retry(job)
+        if retry_at is not None:
+            # Espera en Mongo detras del reintento; la recuperacion los despacha por created_at, en orden.
+            await self._mark(job, {"locked_until": max(retry_at, datetime.utcnow())})
+            return
+
+        attempts = job.get("attempts", 0) + 1
+        try:
+            await self.deliver(job["platform"], job["recipient"], job["message"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            error = getattr(exc, "detail", None) or str(exc)
+            if not self._is_retryable(exc) or attempts >= self.max_attempts:
+                self.failed += 1
+                logger.error(
+                    "Outbound message failed platform=%s recipient=%s attempts=%s: %s",
+                    job["platform"], job["recipient"], attempts, error,
+                )
+                await self._mark(job, {"status": STATUS_FAILED, "attempts": attempts, "last_error": error})
+                return
+
+            delay = self._retry_delay(attempts, exc)
+            retry_at = datetime.utcnow() + timedelta(seconds=delay)
+            self.retried += 1
+            logger.warning(
+                "Outbound message retry platform=%s recipient=%s attempt=%s in %.1fs: %s",
+                job["platform"], job["recipient"], attempts, delay, error,
+            )
+            # El worker no duerme: el envio vuelve a Mongo con su hora de reintento y sigue con los demas.
+            self._parked[self._recipient_key(job)] = (job["_id"], retry_at)
+            await self._mark(job, {"attempts": attempts, "last_error": error, "locked_until": retry_at})
+            return
+
+        self.sent += 1
+        await self._mark(job, {"status": STATUS_SENT, "attempts": attempts, "sent_at": datetime.utcnow()})
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            job = await queue.get()
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Queda pendiente en Mongo; se reintenta cuando venza su lease.
+                logger.exception("Outbound worker error: %s", str(exc))
+            finally:
+                queue.task_done()
+            # Un envio cancelado al apagar sigue reservado para que _release_leases lo libere.
+            self._held.pop(job["_id"], None)
+
+    def _backlog(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "queued": self._backlog(),
+            "sent": self.sent,
+            "retried": self.retried,
+            "retry_scheduled": len(self._parked),
+            "failed": self.failed,
+        }
@@ -1,7 +1,16 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
 from websockets import connect
 
 from app.shared.config.settings import OPENAI_API_KEY, OPENAI_REALTIME_URL
 
+logger = logging.getLogger(__name__)
+
 
 async def connect_openai():
     return await connect(
@@ -11,3 +20,148 @@ async def connect_openai():
             "OpenAI-Beta": "realtime=v1",
         },
     )
+
+
+def _is_open(ws) -> bool:
+    return getattr(ws, "close_code", None) is None
+
+
+async def _close_quietly(ws):
+    try:
+        await ws.close()
+    except Exception:
+        pass
+
+
+class RealtimeConnectionPool:
+    """Pool de websockets de OpenAI Realtime ya conectados y configurados con la sesion base.
+
+    Una tarea de fondo mantiene `size` conexiones ociosas, descarta las que superan
+    `max_idle_seconds` o no responden al ping y repone las que se van entregando.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        max_idle_seconds: float,
+        base_session: Optional[Dict[str, Any]] = None,
+        health_check_interval: float = 20.0,
+        health_check_timeout: float = 5.0,
+    ):
+        self.size = size
+        self.max_idle_seconds = max_idle_seconds
+        self.base_session = base_session or {}
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self._idle = deque()
+        self._refill_needed = asyncio.Event()
+        self._task = None
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+    async def _open(self):
+        ws = await connect_openai()
+        if self.base_session:
+            await ws.send(json.dumps({"type": "session.update", "session": self.base_session}))
+        return ws
+
+    async def _is_healthy(self, ws) -> bool:
+        if not _is_open(ws):
+            return False
+        try:
+            pong_waiter = await ws.ping()
+            await asyncio.wait_for(pong_waiter, timeout=self.health_check_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _discard(self, ws, reason: str):
+        self.discarded += 1
+        logger.info("Realtime pool discarded connection: %s", reason)
+        await _close_quietly(ws)
+
+    async def _check_idle(self):
+        now = time.monotonic()
+        for entry in list(self._idle):
+            created_at, ws = entry
+            if now - created_at > self.max_idle_seconds:
+                reason = "idle timeout"
+            elif not await self._is_healthy(ws):
+                reason = "health check failed"
+            else:
+                continue
+            try:
+                self._idle.remove(entry)
+            except ValueError:
+                # Se entrego a una llamada mientras se revisaba.
+                continue
+            await self._discard(ws, reason)
+
+    async def _fill(self):
+        while len(self._idle) < self.size:
+            ws = await self._open()
+            self._idle.append((time.monotonic(), ws))
+
+    async def _maintain(self):
+        retry_delay = 1.0
+        while True:
+            self._refill_needed.clear()
+            try:
+                await self._check_idle()
+                await self._fill()
+                retry_delay = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Realtime pool refill failed: %s", str(exc))
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30.0)
+                continue
+
+            try:
+                await asyncio.wait_for(self._refill_needed.wait(), timeout=self.health_check_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        if self.size <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._maintain())
+        logger.info("Realtime pool started size=%s max_idle=%ss", self.size, self.max_idle_seconds)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._idle:
+            _, ws = self._idle.popleft()
+            await _close_quietly(ws)
+
+    async def acquire(self):
+        now = time.monotonic()
+        while self._idle:
+            created_at, ws = self._idle.popleft()
+            if now - created_at > self.max_idle_seconds or not _is_open(ws):
+                asyncio.create_task(self._discard(ws, "stale on acquire"))
+                continue
+            self.hits += 1
+            self._refill_needed.set()
+            return ws
+
+        self.misses += 1
+        self._refill_needed.set()
+        return await self._open()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "hits": self.hits,
+            "misses": self.misses,
+            "discarded": self.discarded,
+        }
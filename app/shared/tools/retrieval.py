@@ -1,31 +1,65 @@
+import asyncio
 import logging
 
 import app.shared.tools.embeddings as embeddings
+from app.shared.types.retrieval import RetrievalResult
 
 logger = logging.getLogger(__name__)
 
 
-def search_semantic(query: str, tenant_id: str, top_k: int = 3, k: int = None):
-    limit = k if k is not None else top_k
+def normalize_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
 
-    if embeddings.vector_store is None:
-        embeddings.init_faiss()
-    if embeddings.vector_store is None:
-        logger.info("FAISS is not initialized. Returning no documents.")
-        return []
 
-    results = embeddings.vector_store.similarity_search(query, k=limit)
-    filtered_results = [
-        result
-        for result in results
-        if (result.metadata.get("tenant_id") or result.metadata.get("tenantId")) == tenant_id
-    ]
-    logger.info("Tenant id %r metadata tenant ids: %r", tenant_id, [result.metadata.get("tenant_id") for result in results])
+def embed_query(query: str):
+    return embeddings.embeddings_model.embed_query(normalize_query(query))
+
+
+async def aembed_query(query: str):
+    return await embeddings.embeddings_model.aembed_query(normalize_query(query))
+
+
+def _log_search(query: str, tenant_id: str, results):
     logger.info(
-        "Semantic search query=%r tenant=%s raw=%s filtered=%s",
+        "Semantic search query=%r tenant=%s results=%s",
         query,
         tenant_id,
         len(results),
-        len(filtered_results),
     )
-    return filtered_results
+
+
+def search_semantic(query: str, tenant_id: str, top_k: int = 3, k: int = None):
+    limit = k if k is not None else top_k
+
+    store = embeddings.get_tenant_store(tenant_id)
+    if store is None:
+        logger.info("FAISS shard is not initialized for tenant=%s. Returning no documents.", tenant_id)
+        return []
+
+    results = store.similarity_search_by_vector(embed_query(query), k=limit)
+    _log_search(query, tenant_id, results)
+    return results
+
+
+async def asearch_semantic(query: str, tenant_id: str, top_k: int = 3, k: int = None):
+    limit = k if k is not None else top_k
+
+    # Cargar un shard puede tocar disco o Mongo; la busqueda FAISS es CPU. Ambos van fuera del loop.
+    store = await asyncio.to_thread(embeddings.get_tenant_store, tenant_id)
+    if store is None:
+        logger.info("FAISS shard is not initialized for tenant=%s. Returning no documents.", tenant_id)
+        return []
+
+    embedding = await aembed_query(query)
+    results = await asyncio.to_thread(store.similarity_search_by_vector, embedding, limit)
+    _log_search(query, tenant_id, results)
+    return results
+
+
+def retrieve(query: str, tenant_id: str, top_k: int = 3) -> RetrievalResult:
+    return RetrievalResult(query=query, tenant_id=tenant_id, documents=search_semantic(query, tenant_id, top_k=top_k))
+
+
+async def aretrieve(query: str, tenant_id: str, top_k: int = 3) -> RetrievalResult:
+    documents = await asearch_semantic(query, tenant_id, top_k=top_k)
+    return RetrievalResult(query=query, tenant_id=tenant_id, documents=documents)
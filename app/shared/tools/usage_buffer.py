@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+# Intentos del vaciado final al apagar, con una pausa corta entre ellos.
+FINAL_FLUSH_ATTEMPTS = 3
+
+
+class UsageBuffer:
+    """Acumula registros de uso de tokens y los escribe en lote en segundo plano.
+
+    El lote sale al juntar `batch_size` registros o cada `flush_interval_seconds`, con un
+    `insert_many` no ordenado. Si Mongo falla, los registros vuelven al buffer para el
+    siguiente intento; solo se descartan los mas viejos si se rebasa `max_records`.
+    """
+
+    def __init__(self, collection, batch_size: int, flush_interval_seconds: float, max_records: int):
+        self.collection = collection
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_records = max(self.batch_size, max_records)
+        self._records: List[Dict[str, Any]] = []
+        self._wakeup = None
+        self._task = None
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+
+    def add(self, record: Dict[str, Any]):
+        self._records.append(record)
+        overflow = len(self._records) - self.max_records
+        if overflow > 0:
+            del self._records[:overflow]
+            self.dropped += overflow
+            logger.error("Usage buffer full, dropped %s oldest records", overflow)
+
+        self._ensure_task()
+        if len(self._records) >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_task(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> bool:
+        """Escribe todo lo pendiente; False si hubo que regresar los registros al buffer."""
+        if not self._records:
+            return True
+
+        batch, self._records = self._records, []
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+        except asyncio.CancelledError:
+            # insert_many ya asigno `_id`; si el lote alcanzo a escribirse, el reintento solo da duplicados.
+            self._records[:0] = batch
+            raise
+        except BulkWriteError as exc:
+            # Errores por documento (validacion, duplicados de un reintento) no se resuelven reintentando.
+            errors = [error for error in exc.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY_ERROR]
+            self.flushed += exc.details.get("nInserted", 0)
+            if errors:
+                logger.error("Usage buffer discarded %s records: %s", len(errors), errors[0].get("errmsg"))
+        except Exception as exc:
+            self._records[:0] = batch
+            self.failed_flushes += 1
+            logger.warning("Usage buffer flush failed, %s records kept for retry: %s", len(self._records), str(exc))
+            return False
+        else:
+            self.flushed += len(batch)
+        return True
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        for attempt in range(FINAL_FLUSH_ATTEMPTS):
+            if await self.flush():
+                return
+            if attempt + 1 < FINAL_FLUSH_ATTEMPTS:
+                await asyncio.sleep(1)
+        logger.error("Usage buffer stopped with %s unsaved records", len(self._records))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._records),
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+        }
@@ -1,12 +1,26 @@
 import logging
 from datetime import datetime, timedelta
 
-from app.shared.config.database import usage_collection
+from app.shared.config.database import async_usage_collection, usage_analytics_collection
+from app.shared.config.settings import USAGE_BUFFER_MAX_RECORDS, USAGE_FLUSH_BATCH_SIZE, USAGE_FLUSH_INTERVAL_SECONDS
+from app.shared.tools.usage_buffer import UsageBuffer
+from app.shared.utils.metrics import register_metrics
 
 logger = logging.getLogger(__name__)
 
+# Solo un extracto de pregunta y respuesta para auditar el registro sin inflar la coleccion.
+USAGE_TEXT_MAX_CHARS = 500
 
-def save_token_usage(
+usage_buffer = UsageBuffer(
+    async_usage_collection,
+    batch_size=USAGE_FLUSH_BATCH_SIZE,
+    flush_interval_seconds=USAGE_FLUSH_INTERVAL_SECONDS,
+    max_records=USAGE_BUFFER_MAX_RECORDS,
+)
+register_metrics("usage_buffer", usage_buffer.stats)
+
+
+def _build_usage_doc(
     tenant_id: str,
     conversation_id: str,
     model: str,
@@ -16,35 +30,70 @@ def save_token_usage(
     question: str = None,
     answer: str = None,
     source: str = "web",
+    estimated_prompt_tokens: int = None,
+    usage_estimated: bool = False,
 ):
-    try:
-        usage_doc = {
-            "tenant_id": tenant_id,
-            "conversation_id": conversation_id,
-            "model": model,
-            "tokens": {
-                "prompt_tokens": prompt_tokens,
-                "completion_tokens": completion_tokens,
-                "total_tokens": total_tokens,
-            },
-            "question": question,
-            "answer": answer,
-            "source": source,
-            "timestamp": datetime.utcnow(),
-        }
-        result = usage_collection.insert_one(usage_doc)
-        logger.info("Token usage saved: %s - total=%s", result.inserted_id, total_tokens)
-        return result.inserted_id
-    except Exception as exc:
-        logger.error("Error saving token usage: %s", str(exc))
-        return None
+    return {
+        "tenant_id": tenant_id,
+        "conversation_id": conversation_id,
+        "model": model,
+        "tokens": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": total_tokens,
+            "estimated_prompt_tokens": estimated_prompt_tokens,
+            # True si el proveedor no reporto uso y los conteos salen de tiktoken.
+            "estimated": usage_estimated,
+        },
+        "question": question[:USAGE_TEXT_MAX_CHARS] if question else question,
+        "answer": answer[:USAGE_TEXT_MAX_CHARS] if answer else answer,
+        "source": source,
+        "timestamp": datetime.utcnow(),
+    }
+
+
+def _usage_since_filter(tenant_id: str, days: int) -> dict:
+    return {"tenant_id": tenant_id, "timestamp": {"$gte": datetime.utcnow() - timedelta(days=days)}}
+
+
+def _conversation_usage_filter(tenant_id: str, conversation_id: str) -> dict:
+    return {"tenant_id": tenant_id, "conversation_id": conversation_id}
+
+
+async def asave_token_usage(
+    tenant_id: str,
+    conversation_id: str,
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    total_tokens: int,
+    question: str = None,
+    answer: str = None,
+    source: str = "web",
+    estimated_prompt_tokens: int = None,
+    usage_estimated: bool = False,
+):
+    """Deja el registro en el buffer de uso; se escribe en lote fuera del turno."""
+    usage_doc = _build_usage_doc(
+        tenant_id,
+        conversation_id,
+        model,
+        prompt_tokens,
+        completion_tokens,
+        total_tokens,
+        question,
+        answer,
+        source,
+        estimated_prompt_tokens,
+        usage_estimated,
+    )
+    usage_buffer.add(usage_doc)
 
 
 def get_tenant_usage_stats(tenant_id: str, days: int = 30):
     try:
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
         pipeline = [
-            {"$match": {"tenant_id": tenant_id, "timestamp": {"$gte": cutoff_date}}},
+            {"$match": _usage_since_filter(tenant_id, days)},
             {
                 "$group": {
                     "_id": "$tenant_id",
@@ -56,7 +105,7 @@ def get_tenant_usage_stats(tenant_id: str, days: int = 30):
                 }
             },
         ]
-        result = list(usage_collection.aggregate(pipeline))
+        result = list(usage_analytics_collection.aggregate(pipeline))
         return result[0] if result else None
     except Exception as exc:
         logger.error("Error getting tenant usage stats: %s", str(exc))
@@ -66,7 +115,7 @@ def get_tenant_usage_stats(tenant_id: str, days: int = 30):
 def get_conversation_usage(tenant_id: str, conversation_id: str):
     try:
         pipeline = [
-            {"$match": {"tenant_id": tenant_id, "conversation_id": conversation_id}},
+            {"$match": _conversation_usage_filter(tenant_id, conversation_id)},
             {
                 "$group": {
                     "_id": "$conversation_id",
@@ -77,7 +126,7 @@ def get_conversation_usage(tenant_id: str, conversation_id: str):
                 }
             },
         ]
-        result = list(usage_collection.aggregate(pipeline))
+        result = list(usage_analytics_collection.aggregate(pipeline))
         return result[0] if result else None
     except Exception as exc:
         logger.error("Error getting conversation usage: %s", str(exc))
@@ -86,9 +135,8 @@ def get_conversation_usage(tenant_id: str, conversation_id: str):
 
 def get_usage_by_source(tenant_id: str, days: int = 30):
     try:
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
         pipeline = [
-            {"$match": {"tenant_id": tenant_id, "timestamp": {"$gte": cutoff_date}}},
+            {"$match": _usage_since_filter(tenant_id, days)},
             {
                 "$group": {
                     "_id": "$source",
@@ -98,7 +146,7 @@ def get_usage_by_source(tenant_id: str, days: int = 30):
                 }
             },
         ]
-        return list(usage_collection.aggregate(pipeline))
+        return list(usage_analytics_collection.aggregate(pipeline))
     except Exception as exc:
         logger.error("Error getting usage by source: %s", str(exc))
         return []
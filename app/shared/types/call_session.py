@@ -1,10 +1,27 @@
+import time
+
+from app.shared.tools.audio_utils import AudioFrameCoalescer
+
+
 class CallSession:
-    def __init__(self, stream_sid: str, tenant_id: str = None, caller_phone: str = None):
+    def __init__(
+        self,
+        stream_sid: str,
+        tenant_id: str = None,
+        caller_phone: str = None,
+        audio_coalesce_ms: int = 0,
+    ):
         self.stream_sid = stream_sid
         self.openai_ws = None
         self.is_model_speaking = False
-        self.last_audio_time = None
         self.tenant_id = tenant_id
         self.caller_phone = caller_phone
         self.conversation_id = f"voice_{stream_sid}"
         self.pending_function_call = None
+        self.started_at = time.monotonic()
+        self.first_audio_at = None
+        self.audio_buffer = AudioFrameCoalescer(audio_coalesce_ms)
+        self.audio_flush_handle = None
+        # Tareas de la llamada con referencia propia: se cancelan o esperan al colgar.
+        self.audio_flush_task = None
+        self.tool_tasks = set()
@@ -0,0 +1,29 @@
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+
+@dataclass
+class ConversationState:
+    """Estado de una conversacion leido una vez por turno; los cambios se escriben juntos al final."""
+
+    tenant_id: str
+    conversation_id: str
+    support_active: bool = False
+    name: Optional[str] = None
+    history: Deque[Dict[str, Any]] = field(default_factory=deque)
+    new_messages: List[Dict[str, Any]] = field(default_factory=list)
+    new_name: Optional[str] = None
+
+    def add_message(self, role: str, content: str):
+        self.new_messages.append({"role": role, "content": content, "hour": datetime.utcnow()})
+
+    def set_name(self, name: Optional[str]):
+        if name and name != self.name:
+            self.name = name
+            self.new_name = name
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.new_messages or self.new_name)
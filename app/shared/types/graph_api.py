@@ -0,0 +1,36 @@
+from typing import Optional
+
+from fastapi import HTTPException
+
+# Codigos de la Graph API que indican limite de tasa o throttling temporal.
+GRAPH_RATE_LIMIT_CODES = {4, 17, 32, 613, 80007, 130429, 131048, 131056}
+
+
+class GraphAPIError(HTTPException):
+    """Respuesta de error de la Graph API con el codigo de Meta y el `Retry-After` si vino."""
+
+    def __init__(
+        self,
+        status_code: int,
+        detail: str,
+        error_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(status_code=status_code, detail=detail)
+        self.error_code = error_code
+        self.retry_after = retry_after
+
+    @property
+    def is_rate_limited(self) -> bool:
+        return self.status_code == 429 or self.error_code in GRAPH_RATE_LIMIT_CODES
+
+    @property
+    def is_retryable(self) -> bool:
+        return self.is_rate_limited or self.status_code >= 500
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
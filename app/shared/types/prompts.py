@@ -0,0 +1,45 @@
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass(frozen=True)
+class PromptSection:
+    """Seccion del prompt de sistema con sus tokens antes y despues de compilar."""
+
+    source: str
+    title: str
+    raw_tokens: int
+    tokens: int
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """Prefijo estatico del prompt de sistema para una combinacion base/perfil."""
+
+    base: str
+    profile: str
+    static: str
+    raw_tokens: int
+    tokens: int
+    sections: List[PromptSection] = field(default_factory=list)
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.raw_tokens - self.tokens
+
+
+@dataclass(frozen=True)
+class TurnContext:
+    """Historial y contexto de la empresa de un turno, ya recortados al presupuesto de tokens."""
+
+    history: str
+    context: str
+    budget: int
+    history_tokens: int
+    context_tokens: int
+    dropped_turns: int = 0
+    dropped_chunks: int = 0
+
+    @property
+    def tokens(self) -> int:
+        return self.history_tokens + self.context_tokens
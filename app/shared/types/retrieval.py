@@ -0,0 +1,22 @@
+from dataclasses import dataclass, field
+from typing import Any, List
+
+from app.shared.utils.documents import join_page_contents
+
+
+@dataclass(frozen=True)
+class RetrievalResult:
+    """Resultado de una busqueda semantica ya ejecutada, con o sin documentos."""
+
+    query: str
+    tenant_id: str
+    documents: List[Any] = field(default_factory=list)
+
+    @property
+    def chunks(self) -> List[str]:
+        """Textos de los documentos en orden de relevancia."""
+        return [document.page_content for document in self.documents if getattr(document, "page_content", None)]
+
+    @property
+    def context(self) -> str:
+        return join_page_contents(self.documents)
@@ -0,0 +1,103 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineScheduler:
+    """Heap de deadlines compartido por todo el proceso con una sola tarea de fondo.
+
+    `touch` solo actualiza el deadline en un dict; la entrada vieja del heap se
+    reprograma cuando llega a la cima (borrado perezoso), asi que cada clave genera
+    como mucho un despertar por timeout en lugar de uno por tick.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._callbacks: Dict[Hashable, Callable[[], Awaitable[Any]]] = {}
+        self._deadlines: Dict[Hashable, float] = {}
+        self._heap = []
+        self._wakeup = None
+        self._task = None
+        self.expired = 0
+
+    def register(self, key: Hashable, callback: Callable[[], Awaitable[Any]]):
+        """Asocia la clave a su callback; el deadline empieza a correr con el primer `touch`."""
+        self._callbacks[key] = callback
+
+    def touch(self, key: Hashable, timeout: float):
+        if key not in self._callbacks:
+            return
+        deadline = time.monotonic() + timeout
+        if key in self._deadlines:
+            self._deadlines[key] = deadline
+            return
+
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, key))
+        self._ensure_running()
+        if self._heap[0][1] == key:
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable):
+        self._callbacks.pop(key, None)
+        self._deadlines.pop(key, None)
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def _expire(self, key: Hashable):
+        callback = self._callbacks.pop(key, None)
+        self._deadlines.pop(key, None)
+        if callback is None:
+            return
+        self.expired += 1
+        asyncio.create_task(callback())
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                _, key = heapq.heappop(self._heap)
+                deadline = self._deadlines.get(key)
+                if deadline is None:
+                    continue
+                if deadline > now:
+                    heapq.heappush(self._heap, (deadline, key))
+                    continue
+                try:
+                    self._expire(key)
+                except Exception as exc:
+                    logger.warning("Deadline callback failed scheduler=%s key=%s: %s", self.name, key, str(exc))
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._heap.clear()
+        self._deadlines.clear()
+        self._callbacks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "registered": len(self._callbacks),
+            "armed": len(self._deadlines),
+            "heap_entries": len(self._heap),
+            "expired": self.expired,
+        }
@@ -0,0 +1,11 @@
+from typing import Any, Callable, Dict
+
+_METRIC_PROVIDERS: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, Any]]):
+    _METRIC_PROVIDERS[name] = provider
+
+
+def collect_metrics() -> Dict[str, Dict[str, Any]]:
+    return {name: provider() for name, provider in _METRIC_PROVIDERS.items()}
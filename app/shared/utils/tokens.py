@@ -0,0 +1,51 @@
+import logging
+from functools import lru_cache
+
+from app.shared.config.settings import OPENAI_MODEL
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Aproximacion cuando no hay tokenizer disponible: ~4 caracteres por token.
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as exc:
+        # tiktoken descarga el vocabulario la primera vez; sin red se usa la aproximacion.
+        logger.warning("Tokenizer unavailable for model %s, estimating tokens: %s", model, str(exc))
+        return None
+
+
+def count_tokens(text: str, model: str = OPENAI_MODEL) -> int:
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = OPENAI_MODEL) -> str:
+    """Recorta `text` a `max_tokens` tokens; si se corta, termina en "..."."""
+    if not text or max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        return text if len(text) <= max_chars else text[:max_chars].rstrip() + "..."
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens]).rstrip() + "..."
@@ -2,8 +2,10 @@
 """
 Script para regenerar el índice FAISS desde la knowledge base de MongoDB.
 
+Cada tenant tiene su propio shard en FAISS_PATH/<tenant>/.
+
 Uso:
-    python regenerate_faiss.py              # Regenera todo
+    python regenerate_faiss.py              # Regenera todos los shards
     python regenerate_faiss.py --tenant ID  # Regenera solo un tenant
     python regenerate_faiss.py --clear      # Limpia el índice antiguo
 """
@@ -16,6 +18,7 @@ from langchain_openai import OpenAIEmbeddings
 from langchain.vectorstores import FAISS
 from app.shared.config.database import knowledge_collection as collection
 from app.shared.config.settings import FAISS_PATH, MONGO_DB, OPENAI_API_KEY
+from app.shared.tools.embeddings import tenant_shard_path
 
 FAISS_BACKUP = f"faiss_index.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
@@ -35,6 +38,27 @@ def clear_faiss():
         return True
     return False
 
+def remove_stale_shards(active_paths):
+    """Elimina los shards de tenants que ya no tienen documentos para que dejen de servirse."""
+    if not os.path.isdir(FAISS_PATH):
+        return []
+    active = {os.path.abspath(path) for path in active_paths}
+    removed = []
+    for name in os.listdir(FAISS_PATH):
+        path = os.path.join(FAISS_PATH, name)
+        if os.path.abspath(path) in active or not os.path.exists(os.path.join(path, "index.faiss")):
+            continue
+        shutil.rmtree(path)
+        removed.append(path)
+        print(f"🗑️  Shard sin documentos eliminado: {path}")
+    return removed
+
+def remove_tenant_shard(tenant_id: str):
+    shard_path = tenant_shard_path(tenant_id)
+    if os.path.isdir(shard_path):
+        shutil.rmtree(shard_path)
+        print(f"🗑️  Shard sin documentos eliminado: {shard_path}")
+
 def regenerate_all():
     """Regenera el índice FAISS con toda la knowledge base."""
     print("\n" + "="*60)
@@ -56,18 +80,21 @@ def regenerate_all():
     
     if not docs:
         print("⚠️  No hay documentos en la knowledge base!")
+        remove_stale_shards([])
         return False
     
-    # Preparar datos para FAISS
-    texts = []
-    metadatas = []
+    # Preparar datos para FAISS agrupados por tenant
+    shards = {}
     
     for i, doc in enumerate(docs):
         text = doc.get("text", "")
         if text:
+            tenant_id = doc.get("tenantId") or doc.get("tenant_id") or "unknown"
+            texts, metadatas = shards.setdefault(tenant_id, ([], []))
             texts.append(text)
             metadatas.append({
-                "tenantId": doc.get("tenantId", "unknown"),
+                "tenantId": tenant_id,
+                "tenant_id": tenant_id,
                 "source": doc.get("source", "unknown"),
                 "createdAt": str(doc.get("createdAt", "")),
                 "_id": str(doc.get("_id", ""))
@@ -76,19 +103,24 @@ def regenerate_all():
             if (i + 1) % 10 == 0:
                 print(f"   → Procesados {i + 1}/{len(docs)} documentos")
     
-    print(f"\n✨ Creando índice FAISS con {len(texts)} documentos...")
+    total_texts = sum(len(texts) for texts, _ in shards.values())
+    print(f"\n✨ Creando {len(shards)} shards FAISS con {total_texts} documentos...")
     
     try:
-        # Crear nuevo índice
-        vector_store = FAISS.from_texts(texts, embeddings_model, metadatas=metadatas)
-        
-        # Guardar en disco
-        vector_store.save_local(FAISS_PATH)
-        print(f"✅ Índice guardado en: {FAISS_PATH}")
+        for tenant_id, (texts, metadatas) in shards.items():
+            # Crear shard del tenant y guardarlo en disco
+            vector_store = FAISS.from_texts(texts, embeddings_model, metadatas=metadatas)
+            shard_path = tenant_shard_path(tenant_id)
+            vector_store.save_local(shard_path)
+            print(f"✅ Shard de {tenant_id} guardado en: {shard_path} ({len(texts)} documentos)")
+
+        removed = remove_stale_shards(tenant_shard_path(tenant_id) for tenant_id in shards)
         
         # Estadísticas
         index_stats = {
-            "total_documents": len(texts),
+            "total_documents": total_texts,
+            "total_shards": len(shards),
+            "removed_shards": len(removed),
             "embedding_model": "OpenAI",
             "created_at": datetime.now().isoformat(),
             "db": MONGO_DB
@@ -131,13 +163,15 @@ def regenerate_by_tenant(tenant_id: str):
     
     if not docs:
         print(f"⚠️  No hay documentos para el tenant {tenant_id}")
+        remove_tenant_shard(tenant_id)
         return False
     
     # Preparar datos
     texts = [doc.get("text", "") for doc in docs if doc.get("text")]
     metadatas = [
         {
-            "tenantId": doc.get("tenantId"),
+            "tenantId": tenant_id,
+            "tenant_id": tenant_id,
             "source": doc.get("source", "unknown"),
             "_id": str(doc.get("_id", ""))
         }
@@ -145,11 +179,12 @@ def regenerate_by_tenant(tenant_id: str):
     ]
     
     try:
-        # Crear índice
+        # Crear shard del tenant sin tocar los demas
         vector_store = FAISS.from_texts(texts, embeddings_model, metadatas=metadatas)
-        vector_store.save_local(FAISS_PATH)
+        shard_path = tenant_shard_path(tenant_id)
+        vector_store.save_local(shard_path)
         
-        print(f"\n✅ FAISS regenerado para {tenant_id} con {len(texts)} documentos")
+        print(f"\n✅ FAISS regenerado para {tenant_id} con {len(texts)} documentos en {shard_path}")
         return True
         
     except Exception as e:
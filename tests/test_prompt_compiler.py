@@ -0,0 +1,88 @@
+from app.shared.prompts.compiler import BASE_ADDONS, SPECIALIZATION_ADDONS, compile_system_prompt
+
+TIMEZONE = "America/Mexico_City"
+
+BASE_INPUT = """
+Eres el asistente de la empresa.
+
+
+=====================================
+REGLAS DE AGENDA
+=====================================
+- Pide el correo antes de agendar.
+- Usa el timezone {timezone}.
+- Pide el correo antes de agendar.
+
+1. Confirma fecha y hora.
+2. Confirma fecha y hora.
+"""
+
+BASE_EXPECTED = """Eres el asistente de la empresa.
+
+## REGLAS DE AGENDA
+- Pide el correo antes de agendar.
+- Usa el timezone America/Mexico_City.
+- Pide el correo antes de agendar.
+
+1. Confirma fecha y hora.
+2. Confirma fecha y hora."""
+
+PROFILE_INPUT = """
+=====================================
+PRECIOS
+=====================================
+Precios:
+- Plan basico.
+
+
+- Plan pro.
+
+=====================================
+NO HACER
+=====================================
+- No prometer integraciones sin validacion tecnica.
+
+=====================================
+ESCALAMIENTO
+=====================================
+- No prometer integraciones sin validacion tecnica.
+"""
+
+PROFILE_EXPECTED = """## PRECIOS
+Precios:
+- Plan basico.
+
+- Plan pro.
+
+## NO HACER
+- No prometer integraciones sin validacion tecnica.
+
+## ESCALAMIENTO
+- No prometer integraciones sin validacion tecnica."""
+
+
+def test_compiles_addons_to_expected_text(monkeypatch):
+    monkeypatch.setitem(BASE_ADDONS, "fixture_base", BASE_INPUT)
+    monkeypatch.setitem(SPECIALIZATION_ADDONS, "fixture_profile", PROFILE_INPUT)
+    system = compile_system_prompt("general", "", TIMEZONE)
+
+    compiled = compile_system_prompt("fixture_base", "fixture_profile", TIMEZONE)
+
+    assert compiled.static == "\n\n".join([system.static, BASE_EXPECTED, PROFILE_EXPECTED])
+    assert [section.title for section in compiled.sections[-5:]] == [
+        "fixture_base",
+        "REGLAS DE AGENDA",
+        "PRECIOS",
+        "NO HACER",
+        "ESCALAMIENTO",
+    ]
+
+
+def test_profile_only_adds_its_own_text(monkeypatch):
+    monkeypatch.setitem(SPECIALIZATION_ADDONS, "fixture_profile_only", PROFILE_INPUT)
+    system = compile_system_prompt("general", "", TIMEZONE)
+
+    compiled = compile_system_prompt("general", "fixture_profile_only", TIMEZONE)
+
+    assert compiled.static == system.static + "\n\n" + PROFILE_EXPECTED
+    assert compiled.tokens <= compiled.raw_tokens